@@ -0,0 +1,67 @@
+"""Measures how much memory each widget class uses.
+
+Run from the repository root with::
+
+	python benchmarks/memory_benchmark.py
+
+No window, OpenGL or fonts are needed, since the system draws with the
+recording render backend and measures text with the headless text library.
+"""
+
+import os
+import sys
+import tracemalloc
+
+# So we can find the bgui module
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import bgui
+from bgui.render.recording import RecordingRenderBackend
+from bgui.text.headless import HeadlessTextLibrary
+
+
+COUNT = 20000
+
+
+WIDGETS = (
+	('Widget', lambda parent, name: bgui.Widget(parent, name, size=[0.1, 0.1], pos=[0.1, 0.1])),
+	('Frame', lambda parent, name: bgui.Frame(parent, name, size=[0.1, 0.1], pos=[0.1, 0.1])),
+	('Label', lambda parent, name: bgui.Label(parent, name, text="label", pos=[0.1, 0.1])),
+	('Image', lambda parent, name: bgui.Image(parent, None, name, size=[0.1, 0.1], pos=[0.1, 0.1])),
+	('ProgressBar', lambda parent, name: bgui.ProgressBar(parent, name, size=[0.1, 0.1], pos=[0.1, 0.1])),
+	)
+
+
+def measure(system, create):
+	"""Returns the bytes allocated per widget when creating COUNT widgets"""
+
+	parent = bgui.Frame(system)
+	system.update_layout()
+
+	tracemalloc.start()
+	before = tracemalloc.take_snapshot()
+
+	# Generating names is slow for large numbers of siblings, so name them here
+	widgets = [create(parent, str(i)) for i in range(COUNT)]
+	system.update_layout()
+
+	after = tracemalloc.take_snapshot()
+	tracemalloc.stop()
+
+	# Leave out the list holding the widgets
+	used = sum(i.size_diff for i in after.compare_to(before, 'filename')) - sys.getsizeof(widgets)
+
+	system._remove_widget(parent)
+	return used / COUNT
+
+
+def main():
+	system = bgui.System(HeadlessTextLibrary(), backend=RecordingRenderBackend())
+
+	print("%12s %16s" % ("widget", "bytes/widget"))
+	for name, create in WIDGETS:
+		print("%12s %16.1f" % (name, measure(system, create)))
+
+
+if __name__ == '__main__':
+	main()
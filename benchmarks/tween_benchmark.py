@@ -0,0 +1,70 @@
+"""Measures the per-frame cost of running many concurrent tweens.
+
+Run from the repository root with::
+
+	python benchmarks/tween_benchmark.py
+
+Each row compares the TweenEngine against stepping the same number of
+ArrayAnimation objects one by one.
+"""
+
+import os
+import sys
+import time
+
+# So we can find the bgui module
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from bgui.tween import TweenEngine, USING_NUMPY
+from bgui.widget import ArrayAnimation
+
+
+COUNTS = (100, 1000, 10000)
+FRAMES = 60
+
+
+class Target:
+	"""A stand-in for a widget with a two component position"""
+
+	def __init__(self):
+		self.position = [0.0, 0.0]
+
+
+def bench_engine(count):
+	engine = TweenEngine()
+	start = time.time()
+	for i in range(count):
+		engine.add(Target(), 'position', [1.0, 1.0], 10000, start_time=start)
+
+	# The first step merges the new tweens, so leave it out of the timing
+	engine.update(start)
+
+	t = time.perf_counter()
+	for frame in range(1, FRAMES + 1):
+		engine.update(start + frame / 60)
+	return (time.perf_counter() - t) / FRAMES
+
+
+def bench_animations(count):
+	anims = [ArrayAnimation(Target(), 'position', [1.0, 1.0], 10000, None) for i in range(count)]
+	start = time.time()
+
+	t = time.perf_counter()
+	for frame in range(1, FRAMES + 1):
+		now = start + frame / 60
+		anims[:] = [i for i in anims if i.update(now)]
+	return (time.perf_counter() - t) / FRAMES
+
+
+def main():
+	print("NumPy available:", USING_NUMPY)
+	print("%8s %18s %18s" % ("tweens", "TweenEngine (ms)", "Animation (ms)"))
+
+	for count in COUNTS:
+		engine = bench_engine(count) * 1000
+		anims = bench_animations(count) * 1000
+		print("%8d %18.3f %18.3f" % (count, engine, anims))
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,273 @@
+"""Measures construction, layout, input and drawing for large widget trees.
+
+Run from the repository root with::
+
+	python benchmarks/widget_benchmark.py > results.json
+
+Every combination of tree shape and size is built in a fresh system, and the
+results are written as JSON so runs can be compared between releases. Use
+--help to pick the shapes, sizes and number of frames.
+
+No window, OpenGL or fonts are needed, since the system draws with the
+recording render backend and measures text with the headless text library.
+Images are loaded into the texture atlas as blank pixels.
+
+The tree shapes are:
+
+* deep: chains of nested frames
+* wide: a single frame with every other widget as a direct child
+* text: a grid of labels, frame buttons and text inputs
+* image: a grid of images and image buttons
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import sys
+import time
+
+# So we can find the bgui module
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import bgui
+from bgui.atlas import TextureAtlas
+from bgui.render import GL_RGBA
+from bgui.render.recording import RecordingRenderBackend
+from bgui.text.headless import HeadlessTextLibrary
+from bgui.tween import USING_NUMPY
+
+
+SIZES = (100, 1000, 10000, 50000)
+TREES = ('deep', 'wide', 'text', 'image')
+FRAMES = 20
+EVENTS = 200
+
+# The number of frames in each chain of the deep tree
+DEPTH = 25
+
+# The fraction of widgets that are animated
+ANIMATED = 0.1
+
+VIEWPORT = (1280, 720)
+
+
+class CountingTextLibrary(HeadlessTextLibrary):
+	"""A headless text library that counts how much text it measures"""
+
+	def __init__(self):
+		HeadlessTextLibrary.__init__(self)
+		self.measurements = 0
+
+	def dimensions(self, fontid, text):
+		self.measurements += 1
+		return HeadlessTextLibrary.dimensions(self, fontid, text)
+
+
+class BlankAtlas(TextureAtlas):
+	"""An atlas that loads every image as blank 16x16 pixels"""
+
+	def _load(self, path):
+		return 16, 16, GL_RGBA, bytes(16 * 16 * 4)
+
+
+def grid(count):
+	"""Yields the (pos, size) of each cell in a grid of count cells"""
+
+	side = max(1, int(math.ceil(math.sqrt(count))))
+	cell = 1 / side
+	for i in range(count):
+		yield [(i % side) * cell, (i // side) * cell], [cell * 0.9, cell * 0.9]
+
+
+# Each builder adds about count widgets to the system and returns the widget
+# to give keyboard focus to. Widgets are always named, since generating names
+# is slow for large numbers of siblings.
+
+def build_deep(system, count):
+	chains = max(1, count // DEPTH)
+	focus = None
+
+	for i, (pos, size) in enumerate(grid(chains)):
+		parent = bgui.Frame(system, str(i), pos=pos, size=size)
+		for depth in range(1, min(DEPTH, count)):
+			parent = bgui.Frame(parent, str(depth), pos=[0.02, 0.02], size=[0.96, 0.96])
+
+		if focus is None:
+			focus = parent
+
+	return focus
+
+
+def build_wide(system, count):
+	root = bgui.Frame(system, "root")
+
+	for i, (pos, size) in enumerate(grid(count - 1)):
+		bgui.Frame(root, str(i), pos=pos, size=size)
+
+	return root
+
+
+def build_text(system, count):
+	focus = None
+
+	# Frame buttons and text inputs are made of several widgets each
+	cells = count // 2
+	for i, (pos, size) in enumerate(grid(cells)):
+		kind = i % 10
+		if kind == 0:
+			widget = bgui.TextInput(system, str(i), text="Input %d" % i, pos=pos, size=size)
+			if focus is None:
+				focus = widget
+		elif kind < 4:
+			bgui.FrameButton(system, str(i), text="Button %d" % i, pos=pos, size=size)
+		else:
+			bgui.Label(system, str(i), text="Label number %d" % i, pos=pos)
+
+	return focus
+
+
+def build_image(system, count):
+	system.atlas = BlankAtlas(system.backend)
+
+	for i, (pos, size) in enumerate(grid(count)):
+		if i % 10 == 0:
+			bgui.ImageButton(system, str(i), default_image=("button%d" % (i % 4), 0, 0, 1, 1),
+							hover_image=("hover%d" % (i % 4), 0, 0, 1, 1), pos=pos, size=size)
+		else:
+			bgui.Image(system, "icon%d" % (i % 16), str(i), pos=pos, size=size)
+
+	return system
+
+
+BUILDERS = {
+	'deep': build_deep,
+	'wide': build_wide,
+	'text': build_text,
+	'image': build_image,
+	}
+
+
+def all_widgets(widget):
+	widgets = []
+	stack = list(widget.children.values())
+	while stack:
+		widget = stack.pop()
+		widgets.append(widget)
+		stack.extend(widget.children.values())
+	return widgets
+
+
+def timed(func, repeat=1):
+	"""Returns the average time in milliseconds of calling func"""
+
+	start = time.perf_counter()
+	for i in range(repeat):
+		func()
+	return (time.perf_counter() - start) * 1000 / repeat
+
+
+def bench(tree, size, frames):
+	backend = RecordingRenderBackend(*VIEWPORT)
+	textlib = CountingTextLibrary()
+	system = bgui.System(textlib, backend=backend)
+	rand = random.Random(size)
+	timings = {}
+
+	# Construction includes the first layout pass
+	result = {}
+	def construct():
+		result['focus'] = BUILDERS[tree](system, size)
+		system.update_layout()
+	timings['construct'] = timed(construct)
+	focus = result['focus']
+
+	# Resizing the viewport lays out every widget again
+	def relayout():
+		system.size = [rand.randint(640, 1920), rand.randint(480, 1080)]
+		system.update_layout()
+	timings['relayout'] = timed(relayout, frames)
+	system.size = list(VIEWPORT)
+	system.update_layout()
+
+	positions = [(rand.uniform(0, VIEWPORT[0]), rand.uniform(0, VIEWPORT[1])) for i in range(EVENTS)]
+	def update_mouse():
+		for pos in positions:
+			system.update_mouse(pos)
+	timings['update_mouse'] = timed(update_mouse) / EVENTS
+
+	system.focused_widget = focus
+	def update_keyboard():
+		for i in range(EVENTS):
+			system.update_keyboard(bgui.key_defs.AKEY, False)
+	timings['update_keyboard'] = timed(update_keyboard) / EVENTS
+
+	# Leave the first frame out, it creates textures and caches. Nothing
+	# changes between the other frames, so they shouldn't measure any text.
+	system.render()
+	measurements = textlib.measurements
+	timings['render'] = timed(system.render, frames)
+	measurements = (textlib.measurements - measurements) / frames
+
+	widgets = all_widgets(system)
+	result = {
+		'tree': tree,
+		'size': size,
+		'widgets': len(widgets),
+		'draw_calls': system.draw_calls,
+		'saved_gl_calls': system.saved_gl_calls,
+		'backend_commands': len(backend.commands),
+		'culled_widgets': system.culled_widgets,
+		'text_measurements_per_frame': measurements,
+		}
+
+	# Animate some of the widgets, the layout they invalidate is part of the
+	# timing. The frame stats split it out from the drawing.
+	for widget in rand.sample(widgets, max(1, int(len(widgets) * ANIMATED))):
+		widget.move([rand.random(), rand.random()], 60 * 1000)
+
+	system.stats.window = frames
+	system.stats.enabled = True
+	for i in range(frames):
+		system.render()
+	timings['update_anims'] = system.stats.average('anims_ms') + system.stats.average('layout_ms')
+
+	result['timings_ms'] = timings
+	return result
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+	parser.add_argument('--trees', nargs='+', choices=TREES, default=TREES, help="the tree shapes to build")
+	parser.add_argument('--sizes', nargs='+', type=int, default=SIZES, help="the number of widgets in each tree")
+	parser.add_argument('--frames', type=int, default=FRAMES, help="the number of frames to average over")
+	parser.add_argument('--output', help="write the results to a file instead of stdout")
+	args = parser.parse_args()
+
+	results = []
+	for tree in args.trees:
+		for size in args.sizes:
+			print("%s tree with %d widgets" % (tree, size), file=sys.stderr)
+			results.append(bench(tree, size, args.frames))
+
+	report = {
+		'python': platform.python_version(),
+		'platform': platform.platform(),
+		'numpy': USING_NUMPY,
+		'frames': args.frames,
+		'events': EVENTS,
+		'results': results,
+		}
+
+	if args.output:
+		with open(args.output, 'w') as f:
+			json.dump(report, f, indent=1)
+	else:
+		json.dump(report, sys.stdout, indent=1)
+		print()
+
+
+if __name__ == '__main__':
+	main()
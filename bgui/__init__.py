@@ -1,5 +1,6 @@
 from .system import *
 from .widget import *
+from .timeline import *
 from .frame import *
 from .image import *
 from .image_button import *
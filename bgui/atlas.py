@@ -0,0 +1,391 @@
+"""
+Small images (such as icons and the images used by ImageButton themes) are
+packed into shared textures called atlas pages. Images on the same page are
+drawn with the same texture, so the system can batch them into a single draw
+call instead of binding a texture for every image.
+
+The atlas is used automatically by :py:class:`bgui.image.Image` (and so by
+:py:class:`bgui.image_button.ImageButton`), which rewrites its texture
+coordinates to point into the atlas page. Images that are too large for the
+atlas, or that use texture coordinates outside of 0-1 (for tiling), get a
+texture of their own as before. Set :py:attr:`bgui.system.System.atlas` to None
+before creating any images to disable the atlas. The atlas is only used with
+render backends that support
+:py:attr:`bgui.render.RenderBackend.supports_texture_updates`.
+
+Images stay in the atlas while they are unused, so loading them again is free.
+When a page fills up, the unused images are dropped and the page is repacked
+before another page is created. Images that don't fit on the repacked page
+move to another page, or get a texture of their own.
+"""
+
+from .render import GL_LINEAR, GL_RGBA
+from .texture import ImageTexture, load_image_data
+
+
+# Empty pixels kept around each image so filtering doesn't pick up its neighbors
+_PADDING = 1
+
+
+class ShelfPacker:
+	"""Packs rectangles into rows ("shelves") of a fixed size area"""
+
+	def __init__(self, width, height):
+		self.width = width
+		self.height = height
+		self.clear()
+
+	def clear(self):
+		"""Remove every rectangle"""
+
+		# Each shelf is [y, height, used width]
+		self._shelves = []
+		self._top = 0
+
+	def insert(self, width, height):
+		"""Find room for a rectangle
+
+		:param width: the width of the rectangle
+		:param height: the height of the rectangle
+		:rtype: the (x, y) position of the rectangle, or None if it doesn't fit
+		"""
+
+		if width > self.width:
+			return None
+
+		# Use the shelf that wastes the least height
+		best = None
+		for shelf in self._shelves:
+			if shelf[1] >= height and self.width - shelf[2] >= width:
+				if best is None or shelf[1] < best[1]:
+					best = shelf
+
+		if best is None:
+			if self._top + height > self.height:
+				return None
+
+			best = [self._top, height, 0]
+			self._shelves.append(best)
+			self._top += height
+
+		x = best[2]
+		best[2] += width
+		return x, best[0]
+
+
+class AtlasEntry:
+	"""An image stored in an atlas page"""
+
+	__slots__ = ('path', 'width', 'height', 'page', 'x', 'y', 'uv', 'refcount', '_format', '_data')
+
+	def __init__(self, path, width, height, format, data):
+		#: The path the image was loaded from
+		self.path = path
+
+		#: The size of the image in pixels
+		self.width = width
+		self.height = height
+
+		#: The page the image is on, and its position on the page
+		self.page = None
+		self.x = self.y = 0
+
+		#: The image's (u0, v0, u1, v1) texture coordinates on the page
+		self.uv = (0, 0, 1, 1)
+
+		#: The number of textures using the image
+		self.refcount = 0
+
+		# The pixels are kept so the image can be moved when its page is repacked
+		self._format = format
+		self._data = data
+
+
+class AtlasPage:
+	"""A texture holding several images"""
+
+	def __init__(self, backend, size, interp_mode):
+		self.size = size
+		self.interp_mode = interp_mode
+
+		#: The entries on this page
+		self.entries = []
+
+		self._packer = ShelfPacker(size, size)
+
+		self._backend = backend
+		self.tex_id = backend.create_texture(interp_mode)
+		backend.upload_texture(self.tex_id, size, size, GL_RGBA, None)
+
+	def free(self):
+		"""Delete the page's texture"""
+
+		if self.tex_id is not None:
+			self._backend.delete_texture(self.tex_id)
+			self.tex_id = None
+
+	def add(self, entry):
+		"""Put an entry on the page
+
+		:param entry: the :py:class:`AtlasEntry` to add
+		:rtype: True if the entry fit on the page, False otherwise
+		"""
+
+		pos = self._packer.insert(entry.width + 2 * _PADDING, entry.height + 2 * _PADDING)
+		if pos is None:
+			return False
+
+		entry.page = self
+		entry.x = pos[0] + _PADDING
+		entry.y = pos[1] + _PADDING
+
+		# Keep linear filtering from sampling outside the image by staying half a texel inside it
+		inset = 0.5 if self.interp_mode == GL_LINEAR else 0
+		entry.uv = ((entry.x + inset) / self.size, (entry.y + inset) / self.size,
+					(entry.x + entry.width - inset) / self.size, (entry.y + entry.height - inset) / self.size)
+
+		self._backend.update_texture(self.tex_id, entry.x, entry.y, entry.width, entry.height,
+						entry._format, entry._data)
+
+		self.entries.append(entry)
+		return True
+
+	def repack(self):
+		"""Drop the entries that are no longer used and pack the rest again
+
+		:rtype: a (dropped, displaced) tuple of entry lists, the displaced
+			entries are still used but didn't fit on the page again
+		"""
+
+		dropped = [i for i in self.entries if i.refcount <= 0]
+		kept = [i for i in self.entries if i.refcount > 0]
+
+		self.entries = []
+		self._packer.clear()
+
+		# Tallest first usually packs shelves more tightly, but not always
+		displaced = []
+		for entry in sorted(kept, key=lambda i: i.height, reverse=True):
+			if not self.add(entry):
+				entry.page = None
+				displaced.append(entry)
+
+		for entry in dropped:
+			entry.page = None
+
+		return dropped, displaced
+
+
+class TextureAtlas:
+	"""Shares atlas pages between the images of a system"""
+
+	#: The width and height of each page in pixels
+	page_size = 1024
+
+	#: Images larger than this (in either direction) are not put in the atlas
+	max_image_size = 256
+
+	#: The most pages to create, after that images get their own textures
+	max_pages = 4
+
+	def __init__(self, backend):
+		"""
+		:param backend: the :py:class:`bgui.render.RenderBackend` to create the pages with
+		"""
+
+		#: The render backend the pages are created with
+		self.backend = backend
+
+		#: The atlas pages
+		self.pages = []
+
+		self._entries = {}
+
+	def __del__(self):
+		for page in self.pages:
+			page.free()
+
+	def acquire(self, path, interp_mode):
+		"""Add a reference to an image, loading it into the atlas if needed
+
+		:param path: the path to the image
+		:param interp_mode: the filtering to use for the image
+		:rtype: an :py:class:`AtlasEntry`, or None if the image can't be put in the atlas
+		"""
+
+		key = (path, interp_mode)
+		entry = self._entries.get(key)
+
+		if entry is None:
+			image = self._load(path)
+			if image is None:
+				return None
+
+			width, height, format, data = image
+			if width > self.max_image_size or height > self.max_image_size:
+				return None
+
+			entry = AtlasEntry(path, width, height, format, data)
+			if not self._place(entry, interp_mode):
+				return None
+
+			self._entries[key] = entry
+
+		entry.refcount += 1
+		return entry
+
+	def release(self, entry):
+		"""Remove a reference to an image. Unused images stay in the atlas until their room is needed.
+
+		:param entry: the entry returned by :py:meth:`acquire`
+		"""
+
+		entry.refcount -= 1
+
+	def _load(self, path):
+		return load_image_data(path)
+
+	def _place(self, entry, interp_mode, repack=True):
+		pages = [i for i in self.pages if i.interp_mode == interp_mode]
+
+		for page in pages:
+			if page.add(entry):
+				return True
+
+		# Make room by dropping unused images
+		for page in pages:
+			if repack and any(i.refcount <= 0 for i in page.entries):
+				dropped, displaced = page.repack()
+				for i in dropped:
+					del self._entries[(i.path, interp_mode)]
+
+				# Images that no longer fit move to another page, or (like
+				# images that don't fit in the atlas at all) get a texture of
+				# their own, see AtlasTexture
+				for i in displaced:
+					if not self._place(i, interp_mode, False):
+						del self._entries[(i.path, interp_mode)]
+
+				if page.add(entry):
+					return True
+
+		if len(self.pages) < self.max_pages:
+			page = AtlasPage(self.backend, self.page_size, interp_mode)
+			self.pages.append(page)
+			return page.add(entry)
+
+		return False
+
+
+class AtlasTexture:
+	"""A texture for an image in a :py:class:`TextureAtlas`. This can be used in
+	place of an :py:class:`bgui.texture.ImageTexture`, which it falls back to for
+	images that can't be put in the atlas.
+	"""
+
+	def __init__(self, atlas, image, interp_mode, caching):
+		self._atlas = atlas
+		self._interp_mode = interp_mode
+		self._caching = caching
+
+		self._entry = None
+		self._texture = None
+
+		self.path = None
+		self.image_size = [0, 0]
+
+		self.reload(image)
+
+	def __del__(self):
+		self._release()
+
+	@property
+	def interp_mode(self):
+		return self._interp_mode
+
+	@interp_mode.setter
+	def interp_mode(self, value):
+		if value == self._interp_mode:
+			return
+
+		self._interp_mode = value
+
+		if self._texture:
+			self._texture.interp_mode = value
+		else:
+			# Images on different pages use different filtering
+			path = self.path
+			self.path = None
+			self.reload(path)
+
+	@property
+	def size(self):
+		return self.image_size
+
+	def reload(self, image):
+		if image == self.path:
+			return
+
+		entry = None if self._texture else self._atlas.acquire(image, self._interp_mode)
+		self._release()
+
+		if entry is None:
+			self._use_texture(image)
+		else:
+			self._entry = entry
+			self.image_size = [entry.width, entry.height]
+			self.path = image
+
+	def bind(self):
+		if self._entry is not None and self._entry.page is None:
+			self._use_texture(self.path)
+
+		if self._texture:
+			self._texture.bind()
+		elif self._entry:
+			self._atlas.backend.bind_texture(self._entry.page.tex_id)
+
+	def get_quad(self, texco):
+		"""Returns the texture to bind and the texture coordinates to use to
+		draw the image with the given coordinates
+
+		:param texco: the texture coordinates (relative to the image)
+		:rtype: a (texture id, texture coordinates) tuple
+		"""
+
+		entry = self._entry
+		if entry is not None and entry.page is None:
+			# The image was pushed out of the atlas when its page was repacked
+			self._use_texture(self.path)
+			entry = None
+
+		if entry is None:
+			return self._texture.get_quad(texco) if self._texture else (0, texco)
+
+		for u, v in texco:
+			if not (0 <= u <= 1 and 0 <= v <= 1):
+				# Tiling needs a texture of its own
+				self._use_texture(self.path)
+				return self._texture.get_quad(texco)
+
+		u0, v0, u1, v1 = entry.uv
+		du = u1 - u0
+		dv = v1 - v0
+
+		return entry.page.tex_id, [(u0 + u * du, v0 + v * dv) for u, v in texco]
+
+	def _release(self):
+		if self._entry is not None:
+			self._atlas.release(self._entry)
+			self._entry = None
+
+	def _use_texture(self, image):
+		self._release()
+
+		if self._texture:
+			self._texture.reload(image)
+		else:
+			self._texture = ImageTexture(self._atlas.backend, image, self._interp_mode, self._caching)
+
+		self.image_size = getattr(self._texture, 'image_size', [0, 0])
+		self.path = self._texture.path
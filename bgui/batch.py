@@ -0,0 +1,134 @@
+"""
+The system collects the quads drawn by widgets such as Frames, ProgressBars and
+Images into a single batch, and draws the whole batch at once just before
+something that isn't batched (like text) needs to be drawn over it. Textured
+quads are batched as long as they use the same texture, so images that share a
+page of the system's texture atlas (see :py:mod:`bgui.atlas`) are drawn together.
+
+Borders are drawn as thin quads rather than as lines, so a batch is always a
+single draw call (see :py:meth:`bgui.render.RenderBackend.draw_quads`).
+
+Widgets that draw with OpenGL themselves need the batch to be drawn first. This
+happens automatically for widgets that leave Widget._batched set to False.
+"""
+
+from .render import GL_BLEND, GL_TEXTURE_2D, GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA
+
+
+# The number of floats per vertex (x, y, u, v, r, g, b, a)
+_STRIDE = 8
+
+
+class QuadBatch:
+	"""A batch of quads that are either solid colored or share a texture"""
+
+	def __init__(self, backend):
+		"""
+		:param backend: the :py:class:`bgui.render.RenderBackend` to draw with
+		"""
+
+		self._backend = backend
+		self._data = []
+
+		# The texture used by the quads in the batch (None for solid colored quads)
+		self._texture = None
+
+		#: The number of draw calls used so far, this is reset by the system every frame
+		self.draw_calls = 0
+
+	def __len__(self):
+		"""The number of quads waiting to be drawn"""
+		return len(self._data) // (_STRIDE * 4)
+
+	def add_quad(self, x0, y0, x1, y1, c1, c2, c3, c4):
+		"""Add a quad with a color for each corner, counter-clockwise from the bottom left
+
+		:param x0: the left edge
+		:param y0: the bottom edge
+		:param x1: the right edge
+		:param y1: the top edge
+		"""
+
+		if self._texture is not None:
+			self.flush()
+
+		self._data.extend((
+				x0, y0, 0, 0, c1[0], c1[1], c1[2], c1[3],
+				x1, y0, 0, 0, c2[0], c2[1], c2[2], c2[3],
+				x1, y1, 0, 0, c3[0], c3[1], c3[2], c3[3],
+				x0, y1, 0, 0, c4[0], c4[1], c4[2], c4[3],
+				))
+
+	def add_textured_quad(self, texture, x0, y0, x1, y1, texco, color):
+		"""Add a textured quad. The batch is drawn first if it is using a different texture.
+
+		:param texture: the id of the texture to use
+		:param texco: the texture coordinates for each corner, counter-clockwise from the bottom left
+		:param color: the color to multiply the texture by
+		"""
+
+		if texture != self._texture:
+			self.flush()
+			self._texture = texture
+
+		t1, t2, t3, t4 = texco
+		r, g, b, a = color
+
+		self._data.extend((
+				x0, y0, t1[0], t1[1], r, g, b, a,
+				x1, y0, t2[0], t2[1], r, g, b, a,
+				x1, y1, t3[0], t3[1], r, g, b, a,
+				x0, y1, t4[0], t4[1], r, g, b, a,
+				))
+
+	def add_outline(self, x0, y0, x1, y1, width, color):
+		"""Add an outline around a rectangle, centered on its edges
+
+		:param width: the width of the outline in pixels
+		:param color: the color of the outline
+		"""
+
+		if self._texture is not None:
+			self.flush()
+
+		# Lines are never drawn thinner than a pixel
+		half = max(width, 1.0) / 2
+		r, g, b, a = color
+
+		# Bottom and top edges cover the corners, the sides fit between them
+		for qx0, qy0, qx1, qy1 in (
+				(x0 - half, y0 - half, x1 + half, y0 + half),
+				(x0 - half, y1 - half, x1 + half, y1 + half),
+				(x0 - half, y0 + half, x0 + half, y1 - half),
+				(x1 - half, y0 + half, x1 + half, y1 - half),
+				):
+			self._data.extend((
+					qx0, qy0, 0, 0, r, g, b, a,
+					qx1, qy0, 0, 0, r, g, b, a,
+					qx1, qy1, 0, 0, r, g, b, a,
+					qx0, qy1, 0, 0, r, g, b, a,
+					))
+
+	def flush(self):
+		"""Draw everything in the batch and empty it"""
+
+		data = self._data
+		texture = self._texture
+		if not data:
+			return
+		self._data = []
+		self._texture = None
+
+		backend = self._backend
+		backend.enable(GL_BLEND)
+		backend.blend_func(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+
+		# The texture is left bound afterwards, so batches using the same texture don't rebind it
+		if texture is None:
+			backend.disable(GL_TEXTURE_2D)
+		else:
+			backend.enable(GL_TEXTURE_2D)
+			backend.bind_texture(texture)
+
+		backend.draw_quads(data)
+		self.draw_calls += 1
@@ -1,6 +1,7 @@
 from .system import System as BguiSystem
 from .widget import Widget, BGUI_MOUSE_NONE, BGUI_MOUSE_CLICK, BGUI_MOUSE_RELEASE, BGUI_MOUSE_ACTIVE
 from .text.blf import BlfTextLibrary
+from .text.cache import CachedTextLibrary
 from . import key_defs
 from bge import logic, events, render
 import collections
@@ -31,7 +32,7 @@ class System(BguiSystem):
 		:param theme: the path to a theme directory
 
 		"""
-		super().__init__(BlfTextLibrary(), theme)
+		super().__init__(CachedTextLibrary(BlfTextLibrary()), theme)
 
 		self.mouse = logic.mouse
 
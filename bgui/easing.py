@@ -0,0 +1,141 @@
+"""
+Easing curves for animations and tweens. Curves are looked up by name (for
+example ``'out_cubic'``), and each one is sampled once into a lookup table so
+that evaluating a complex curve costs the same as a linear one.
+
+The available curves are:
+
+	* linear
+	* in_quad, out_quad, in_out_quad
+	* in_cubic, out_cubic, in_out_cubic
+	* in_sine, out_sine, in_out_sine
+	* in_expo, out_expo, in_out_expo
+	* in_back, out_back, in_out_back
+	* in_elastic, out_elastic
+	* in_bounce, out_bounce
+
+Any function that maps 0-1 onto a progress value can also be used in place of a
+name, in which case it is tabulated on first use.
+"""
+
+import math
+import weakref
+
+#: The number of samples taken of each curve
+EASING_RESOLUTION = 1024
+
+
+def _out_bounce(t):
+	if t < 1 / 2.75:
+		return 7.5625 * t * t
+	elif t < 2 / 2.75:
+		t -= 1.5 / 2.75
+		return 7.5625 * t * t + 0.75
+	elif t < 2.5 / 2.75:
+		t -= 2.25 / 2.75
+		return 7.5625 * t * t + 0.9375
+	else:
+		t -= 2.625 / 2.75
+		return 7.5625 * t * t + 0.984375
+
+
+def _out_elastic(t):
+	if t in (0, 1):
+		return t
+	return 2 ** (-10 * t) * math.sin((t - 0.075) * (2 * math.pi) / 0.3) + 1
+
+
+_BACK = 1.70158
+
+EASING_FUNCTIONS = {
+	'linear': lambda t: t,
+	'in_quad': lambda t: t * t,
+	'out_quad': lambda t: t * (2 - t),
+	'in_out_quad': lambda t: 2 * t * t if t < 0.5 else 1 - 2 * (1 - t) ** 2,
+	'in_cubic': lambda t: t ** 3,
+	'out_cubic': lambda t: 1 - (1 - t) ** 3,
+	'in_out_cubic': lambda t: 4 * t ** 3 if t < 0.5 else 1 - 4 * (1 - t) ** 3,
+	'in_sine': lambda t: 1 - math.cos(t * math.pi / 2),
+	'out_sine': lambda t: math.sin(t * math.pi / 2),
+	'in_out_sine': lambda t: (1 - math.cos(t * math.pi)) / 2,
+	'in_expo': lambda t: 0 if t == 0 else 2 ** (10 * (t - 1)),
+	'out_expo': lambda t: 1 if t == 1 else 1 - 2 ** (-10 * t),
+	'in_out_expo': lambda t: t if t in (0, 1) else 2 ** (20 * t - 10) / 2 if t < 0.5 else 1 - 2 ** (10 - 20 * t) / 2,
+	'in_back': lambda t: t * t * ((_BACK + 1) * t - _BACK),
+	'out_back': lambda t: 1 - (1 - t) * (1 - t) * ((_BACK + 1) * (1 - t) - _BACK),
+	'in_out_back': lambda t: (2 * t) ** 2 * ((_BACK * 1.525 + 1) * 2 * t - _BACK * 1.525) / 2 if t < 0.5 else
+				1 - (2 - 2 * t) ** 2 * ((_BACK * 1.525 + 1) * (2 - 2 * t) - _BACK * 1.525) / 2,
+	'in_elastic': lambda t: 1 - _out_elastic(1 - t),
+	'out_elastic': _out_elastic,
+	'in_bounce': lambda t: 1 - _out_bounce(1 - t),
+	'out_bounce': _out_bounce,
+	}
+
+
+class EasingTable:
+	"""A curve sampled into a lookup table. Calling the table with a progress
+	value between 0 and 1 returns the eased value."""
+
+	__slots__ = ('name', 'values')
+
+	def __init__(self, name, function, resolution=EASING_RESOLUTION):
+		"""
+		:param name: the name of the curve
+		:param function: the curve to sample
+		:param resolution: the number of samples to take
+		"""
+
+		self.name = name
+		self.values = [float(function(i / resolution)) for i in range(resolution + 1)]
+
+	def __call__(self, t):
+		last = len(self.values) - 1
+
+		if t <= 0:
+			return self.values[0]
+		if t >= 1:
+			return self.values[last]
+
+		x = t * last
+		i = int(x)
+		low = self.values[i]
+		return low + (self.values[i + 1] - low) * (x - i)
+
+	def __repr__(self):
+		return "<EasingTable %s>" % self.name
+
+
+# Tables for the named curves, and for functions (which are dropped along
+# with the function, so curves made on the fly don't pile up)
+_tables = {}
+_function_tables = weakref.WeakKeyDictionary()
+
+
+def get_easing(easing):
+	"""Returns the lookup table for an easing curve
+
+	:param easing: the name of a curve, a function or an existing :py:class:`EasingTable`
+	:rtype: :py:class:`EasingTable`
+	"""
+
+	if isinstance(easing, EasingTable):
+		return easing
+
+	if callable(easing):
+		try:
+			table = _function_tables.get(easing)
+		except TypeError:
+			# Functions that can't be weakly referenced aren't cached
+			return EasingTable(getattr(easing, '__name__', repr(easing)), easing)
+
+		if table is None:
+			table = _function_tables[easing] = EasingTable(getattr(easing, '__name__', repr(easing)), easing)
+		return table
+
+	table = _tables.get(easing)
+	if table is None:
+		if easing not in EASING_FUNCTIONS:
+			raise ValueError("Unknown easing curve: %s" % (easing,))
+		table = _tables[easing] = EasingTable(easing, EASING_FUNCTIONS[easing])
+
+	return table
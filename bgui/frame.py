@@ -1,9 +1,10 @@
-from .gl_utils import *
 from .widget import Widget, BGUI_DEFAULT
 
 
 class Frame(Widget):
 	"""Frame for storing other widgets"""
+	__slots__ = ('colors', 'border_color', 'border')
+	_batched = True
 	theme_section = 'Frame'
 	theme_options = {
 				'Color1': (0, 0, 0, 0),
@@ -50,37 +51,15 @@ class Frame(Widget):
 	def _draw(self):
 		"""Draw the frame"""
 
-		# Enable alpha blending
-		glEnable(GL_BLEND)
-		glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+		# The quads are drawn later by the system's batch (see bgui.batch)
+		batch = self._system()._batch
 
-		# Enable polygon offset
-		glEnable(GL_POLYGON_OFFSET_FILL)
-		glPolygonOffset(1.0, 1.0)
-
-		glBegin(GL_QUADS)
-		for i in range(4):
-			glColor4f(self.colors[i][0], self.colors[i][1], self.colors[i][2], self.colors[i][3])
-			glVertex2f(self._gl_position[i][0], self._gl_position[i][1])
-		glEnd()
-
-		glDisable(GL_POLYGON_OFFSET_FILL)
+		x0, y0, x1, y1 = self._gl_rect
+		c1, c2, c3, c4 = self.colors
+		batch.add_quad(x0, y0, x1, y1, c1, c2, c3, c4)
 
 		# Draw an outline
 		if self.border > 0:
-			# border = self.border/2
-			r, g, b, a = self.border_color
-			glColor4f(r, g, b, a)
-			glPolygonMode(GL_FRONT, GL_LINE)
-			glLineWidth(self.border)
-
-			glBegin(GL_QUADS)
-			for i in range(4):
-				glVertex2f(self._gl_position[i][0], self._gl_position[i][1])
-
-			glEnd()
-
-			glLineWidth(1.0)
-			glPolygonMode(GL_FRONT, GL_FILL)
+			batch.add_outline(x0, y0, x1, y1, self.border, self.border_color)
 
 		Widget._draw(self)
@@ -5,6 +5,7 @@ from .label import Label
 
 class FrameButton(Widget):
 	"""A clickable frame-based button."""
+	_batched = True
 	theme_section = 'FrameButton'
 	theme_options = {
 				'Color': (0.4, 0.4, 0.4, 1),
@@ -0,0 +1,121 @@
+"""
+A gap buffer is a list with a block of unused slots (the gap) kept where the
+last edit happened. Inserting and deleting at the gap only fills or widens
+it, and moving it costs as much as the distance moved, so a run of edits
+around a caret takes constant time per edit however long the list is.
+
+TextInput keeps its characters, and their widths, in gap buffers.
+"""
+
+# The smallest gap to leave when the buffer needs to grow
+_MIN_GAP = 16
+
+
+class GapBuffer:
+	"""A list that is quick to edit near where it was last edited"""
+
+	__slots__ = ('_items', '_start', '_end')
+
+	def __init__(self, items=()):
+		"""
+		:param items: the initial contents
+		"""
+
+		self._items = list(items)
+		self._start = len(self._items)
+		self._items.extend([None] * _MIN_GAP)
+		self._end = len(self._items)
+
+	def __len__(self):
+		return len(self._items) - (self._end - self._start)
+
+	def __iter__(self):
+		return iter(self.tolist())
+
+	def __getitem__(self, index):
+		if isinstance(index, slice):
+			start, stop, step = index.indices(len(self))
+			if step != 1:
+				return self.tolist()[index]
+
+			# Only copy the items in the range
+			gap_start = self._start
+			gap = self._end - gap_start
+			if stop <= gap_start:
+				return self._items[start:stop]
+			elif start >= gap_start:
+				return self._items[start + gap:stop + gap]
+			return self._items[start:gap_start] + self._items[self._end:stop + gap]
+
+		length = len(self)
+		if index < 0:
+			index += length
+		if not 0 <= index < length:
+			raise IndexError("GapBuffer index out of range")
+
+		if index >= self._start:
+			index += self._end - self._start
+		return self._items[index]
+
+	def __eq__(self, other):
+		if isinstance(other, GapBuffer):
+			other = other.tolist()
+		return self.tolist() == other
+
+	def __repr__(self):
+		return "GapBuffer(%r)" % self.tolist()
+
+	def tolist(self):
+		"""Returns the contents as a list"""
+		return self._items[:self._start] + self._items[self._end:]
+
+	def _move_gap(self, index):
+		items = self._items
+		start = self._start
+		end = self._end
+
+		if index < start:
+			# Move the items between index and the gap to the end of the gap
+			count = start - index
+			items[end - count:end] = items[index:start]
+			self._start = index
+			self._end = end - count
+		elif index > start:
+			# Move the items after the gap to the start of it
+			count = index - start
+			items[start:index] = items[end:end + count]
+			self._start = index
+			self._end = end + count
+
+	def replace(self, start, end, items):
+		"""Replace the contents from start to end with items
+
+		:param start: the index of the first item to replace
+		:param end: the index after the last item to replace (start for a plain insert)
+		:param items: a sequence of the new items
+		"""
+
+		if not 0 <= start <= end <= len(self):
+			raise IndexError("GapBuffer range out of range")
+
+		# Put the gap after the replaced items, then widen it over them
+		self._move_gap(end)
+		self._start = start
+
+		count = len(items)
+		if count > self._end - self._start:
+			# Grow in proportion to the size of the buffer so growing is amortized
+			grow = max(count, len(self), _MIN_GAP)
+			self._items[self._end:self._end] = [None] * grow
+			self._end += grow
+
+		self._items[start:start + count] = items
+		self._start = start + count
+
+	def insert(self, index, items):
+		"""Insert a sequence of items before index"""
+		self.replace(index, index, items)
+
+	def delete(self, start, end):
+		"""Delete the items from start to end"""
+		self.replace(start, end, ())
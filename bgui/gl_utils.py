@@ -35,12 +35,44 @@ if USING_BGL:
 
 	_glGetIntegerv = glGetIntegerv
 	def glGetIntegerv(pname):
-		# Only used for GL_VIEWPORT right now, so assume we want a size 4 Buffer
+		# Only used for GL_VIEWPORT and single values right now, so assume a size 4
+		# Buffer is big enough
 		buf = Buffer(GL_INT, 4)
 		_glGetIntegerv(pname, buf)
 		return buf.to_list()
 
+
+	_glTexImage2D = glTexImage2D
+	def glTexImage2D(target, level, internalformat, width, height, border, format, type, pixels):
+		# Like PyOpenGL, allow None for an empty (RGBA) texture
+		if pixels is None:
+			pixels = Buffer(GL_BYTE, width * height * 4)
+		_glTexImage2D(target, level, internalformat, width, height, border, format, type, pixels)
+
+
+	# Older versions of Blender don't have framebuffer objects
+	try:
+		_glGenFramebuffers = glGenFramebuffers
+		_glDeleteFramebuffers = glDeleteFramebuffers
+	except NameError:
+		pass
+	else:
+		def glGenFramebuffers(n):
+			id_buf = Buffer(GL_INT, n)
+			_glGenFramebuffers(n, id_buf)
+			return id_buf.to_list()[0] if n == 1 else id_buf.to_list()
+
+
+		def glDeleteFramebuffers(framebuffers):
+			n = len(framebuffers)
+			id_buf = Buffer(GL_INT, n, framebuffers)
+			_glDeleteFramebuffers(n, id_buf)
+
 else:
 	# The following line is to make ReadTheDocs happy
 	from OpenGL.GL import glTexImage2D, GL_NEAREST, GL_LINEAR
 
+	_glDeleteFramebuffers = glDeleteFramebuffers
+	def glDeleteFramebuffers(framebuffers):
+		_glDeleteFramebuffers(len(framebuffers), framebuffers)
+
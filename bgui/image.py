@@ -7,8 +7,9 @@ This module defines the following constants:
 	* BGUI_LINEAR
 """
 
-from .gl_utils import *
+from .render import GL_NEAREST, GL_LINEAR
 from .texture import ImageTexture
+from .atlas import AtlasTexture
 
 from .widget import Widget, BGUI_DEFAULT, BGUI_CACHE
 
@@ -20,6 +21,9 @@ BGUI_LINEAR = GL_LINEAR
 class Image(Widget):
 	"""Widget for displaying images"""
 
+	__slots__ = ('_texture', 'texco', 'color')
+	_batched = True
+
 	def __init__(self, parent, img, name=None, aspect=None, size=[0, 0], pos=[0, 0],
 				texco=[(0, 0), (1, 0), (1, 1), (0, 1)], interp_mode=BGUI_LINEAR, sub_theme='', options=BGUI_DEFAULT):
 		""":param parent: the widget's parent
@@ -37,11 +41,16 @@ class Image(Widget):
 		Widget.__init__(self, parent, name, aspect, size, pos, sub_theme, options)
 
 		if img != None:
-			self._texture = ImageTexture(img, interp_mode, options & BGUI_CACHE)
+			atlas = self.system.atlas
+			if atlas is not None:
+				self._texture = AtlasTexture(atlas, img, interp_mode, options & BGUI_CACHE)
+			else:
+				self._texture = ImageTexture(self.system.backend, img, interp_mode, options & BGUI_CACHE)
 		else:
 			self._texture = None
 
-		#: The UV texture coordinates to use for the image.
+		#: The UV texture coordinates to use for the image. Images in the system's
+		#: texture atlas have these mapped onto their atlas page when they are drawn.
 		self.texco = texco
 
 		#: The color of the plane the texture is on.
@@ -73,26 +82,12 @@ class Image(Widget):
 	def _draw(self):
 		"""Draws the image"""
 
-		# Enable textures
-		glEnable(GL_TEXTURE_2D)
-
-		# Enable alpha blending
-		glEnable(GL_BLEND)
-		glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
-
-		# Bind the texture
-		self._texture.bind()
-
-		# Draw the textured quad
-		glColor4f(*self.color)
-
-		glBegin(GL_QUADS)
-		for i in range(4):
-			glTexCoord2f(self.texco[i][0], self.texco[i][1])
-			glVertex2f(self._gl_position[i][0], self._gl_position[i][1])
-		glEnd()
+		if self._texture:
+			# Images sharing an atlas page end up in the same batch
+			tex_id, texco = self._texture.get_quad(self.texco)
 
-		glBindTexture(GL_TEXTURE_2D, 0)
+			x0, y0, x1, y1 = self._gl_rect
+			self._system()._batch.add_textured_quad(tex_id, x0, y0, x1, y1, texco, self.color)
 
 		# Now draw the children
 		Widget._draw(self)
@@ -5,6 +5,7 @@ from .frame import Frame
 
 class ImageButton(Widget):
 	"""A clickable image-based button."""
+	_batched = True
 
 	theme_section = 'ImageButton'
 	theme_options = {
@@ -1,9 +1,10 @@
-from .gl_utils import *
 from .widget import Widget, BGUI_DEFAULT, BGUI_NO_NORMALIZE
 
 
 class Label(Widget):
 	"""Widget for displaying text"""
+	__slots__ = ('fontid', 'color', 'outline_color', 'outline_size', 'outline_smoothing', '_text', '_pt_size')
+	_batched = True
 	theme_section = 'Label'
 	theme_options = {
 				'Font': '',
@@ -30,6 +31,9 @@ class Label(Widget):
 		"""
 		Widget.__init__(self, parent, name, None, [0, 0], pos, sub_theme, options)
 
+		# Nothing has been measured yet
+		self._text = None
+
 		if font:
 			self.fontid = self.system.textlib.load(font)
 		else:
@@ -71,8 +75,19 @@ class Label(Widget):
 
 	@text.setter
 	def text(self, value):
-		self.system.textlib.size(self.fontid, self.pt_size, 72)
-		size = [self.system.textlib.dimensions(self.fontid, value)[0], self.system.textlib.dimensions(self.fontid, 'Mj')[0]]
+		# Setting the same text again doesn't need it measured again
+		if value == self._text:
+			return
+
+		self._text = value
+		self._measure()
+
+	def _measure(self):
+		"""Size the label to fit its text"""
+
+		textlib = self.system.textlib
+		textlib.size(self.fontid, self.pt_size, 72)
+		size = [i[0] for i in textlib.measure_many(self.fontid, (self._text, 'Mj'))]
 
 		if not (self.options & BGUI_NO_NORMALIZE):
 			size[0] /= self.parent._base_width
@@ -81,7 +96,9 @@ class Label(Widget):
 		self.width = size[0]
 		self.height = size[1]
 
-		self._text = value
+		# The number of lines may have changed
+		self._invalidate_bounds()
+		self.invalidate()
 
 	@property
 	def pt_size(self):
@@ -96,29 +113,60 @@ class Label(Widget):
 		else:
 			self._pt_size = value
 
-	def _draw_text(self, x, y):
-		for i, txt in enumerate([i for i in self._text.split('\n')]):
-			self.system.textlib.position(self.fontid, x, y - (self._base_height * i), 0)
-			self.system.textlib.draw(self.fontid, txt.replace('\t', '    '))
+		# The text needs measuring at the new size
+		if self._text is not None:
+			self._measure()
 
-	def _draw(self):
-		"""Display the text"""
+	def _get_draw_rect(self):
+		x0, y0, x1, y1 = self._rect
+
+		# Extra lines are drawn below the first one, and the outline around the text
+		y0 -= (y1 - y0) * self._text.count('\n')
+		outline = self.outline_size
+		return (x0 - outline, y0 - outline, x1 + outline, y1 + outline)
+
+	def _draw_lines(self, lines, x, y):
+		"""Draw lines of text in the label's font, size, color and outline
 
-		self.system.textlib.size(self.fontid, self.pt_size, 72)
+		:param lines: a list of (x, y, text) tuples, relative to the x and y arguments
+		:param x: the x position to draw the lines from
+		:param y: the y position to draw the lines from
+		"""
+
+		system = self._system()
+		backend = system.backend
+		textlib = system.textlib
+
+		# Draw any quads (such as a background frame) before the text
+		system._batch.flush()
+
+		textlib.size(self.fontid, self.pt_size, 72)
 
 		if self.outline_size:
-			glColor4f(*self.outline_color)
+			backend.set_color(self.outline_color)
 			if self.outline_smoothing:
 				steps = range(-self.outline_size, self.outline_size + 1)
 			else:
 				steps = (-self.outline_size, 0, self.outline_size)
 
-			for x in steps:
-				for y in steps:
-					self._draw_text(self._base_x + x, self._base_y + y)
+			for dx in steps:
+				for dy in steps:
+					for lx, ly, txt in lines:
+						backend.draw_text(textlib, self.fontid, x + lx + dx, y + ly + dy, txt)
+			system._text_draws += len(lines) * len(steps) ** 2
 
-		glColor4f(*self.color)
-		self._draw_text(self._base_x, self._base_y)
+		backend.set_color(self.color)
+		for lx, ly, txt in lines:
+			backend.draw_text(textlib, self.fontid, x + lx, y + ly, txt)
+		system._text_draws += len(lines)
 
-		Widget._draw(self)
+	def _draw(self):
+		"""Display the text"""
+
+		x0, y0, x1, y1 = self._gl_rect
+		line_height = y1 - y0
 
+		lines = [(0, -line_height * i, txt.replace('\t', '    ')) for i, txt in enumerate(self._text.split('\n'))]
+		self._draw_lines(lines, x0, y0)
+
+		Widget._draw(self)
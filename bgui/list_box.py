@@ -111,21 +111,20 @@ class ListBox(Widget):
 			w = self.renderer.render_item(item)
 			w.position = [0, 1 - (idx + 1) * (w.size[1] / self.size[1]) - (idx * self.padding)]
 			w.size = [1, w.size[1] / self.size[1]]
-			self._spatial_map[item] = [i[:] for i in w.gl_position]  # Make a full copy
+			self._spatial_map[item] = w._gl_rect
 			w._draw()
 
 			if self.selected == item:
-				#self.highlight.gl_position = [i[:] for i in w.gl_position]  # TODO not modify gl_position
+				#self.highlight.gl_position = w._gl_rect  # TODO not modify gl_position
 				self.highlight.visible = True
 
 	def _handle_mouse(self, pos, event):
 
 		if event == BGUI_MOUSE_CLICK:
-			for item, gl_position in self._spatial_map.items():
-				if (gl_position[0][0] <= pos[0] <= gl_position[1][0]) and \
-					(gl_position[0][1] <= pos[1] <= gl_position[2][1]):
-						self.selected = item
-						break
+			for item, (x0, y0, x1, y1) in self._spatial_map.items():
+				if x0 <= pos[0] <= x1 and y0 <= pos[1] <= y1:
+					self.selected = item
+					break
 			else:
 				self.selected = None
 
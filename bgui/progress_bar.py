@@ -1,10 +1,11 @@
-from .gl_utils import *
 from .widget import Widget, BGUI_DEFAULT
 
 
 class ProgressBar(Widget):
 	"""A solid progress bar.
 	Controlled via the 'percent' property which assumes percent as a 0-1 floating point number."""
+	__slots__ = ('fill_colors', 'bg_colors', 'border_color', 'border', '_percent')
+	_batched = True
 	theme_section = 'ProgressBar'
 	theme_options = {
 				'FillColor1': (0.0, 0.42, 0.02, 1.0),
@@ -64,60 +65,23 @@ class ProgressBar(Widget):
 
 	def _draw(self):
 		"""Draw the progress bar"""
-		# Enable alpha blending
-		glEnable(GL_BLEND)
-		glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
 
-		# Enable polygon offset
-		glEnable(GL_POLYGON_OFFSET_FILL)
-		glPolygonOffset(1.0, 1.0)
+		# The quads are drawn later by the system's batch (see bgui.batch)
+		batch = self._system()._batch
 
-		mid_x = self._gl_position[0][0] + (self._gl_position[1][0] - self._gl_position[0][0]) * self._percent
+		x0, y0, x1, y1 = self._gl_rect
+		mid_x = x0 + (x1 - x0) * self._percent
 
 		# Draw fill
-		glBegin(GL_QUADS)
-		glColor4f(self.fill_colors[0][0], self.fill_colors[0][1], self.fill_colors[0][2], self.fill_colors[0][3])
-		glVertex2f(self._gl_position[0][0], self._gl_position[0][1])
-
-		glColor4f(self.fill_colors[1][0], self.fill_colors[1][1], self.fill_colors[1][2], self.fill_colors[1][3])
-		glVertex2f(mid_x, self._gl_position[1][1])
-
-		glColor4f(self.fill_colors[2][0], self.fill_colors[2][1], self.fill_colors[2][2], self.fill_colors[2][3])
-		glVertex2f(mid_x, self._gl_position[2][1])
-
-		glColor4f(self.fill_colors[3][0], self.fill_colors[3][1], self.fill_colors[3][2], self.fill_colors[3][3])
-		glVertex2f(self._gl_position[3][0], self._gl_position[3][1])
-		glEnd()
+		c1, c2, c3, c4 = self.fill_colors
+		batch.add_quad(x0, y0, mid_x, y1, c1, c2, c3, c4)
 
 		# Draw bg
-		glBegin(GL_QUADS)
-		glColor4f(self.bg_colors[0][0], self.bg_colors[0][1], self.bg_colors[0][2], self.bg_colors[0][3])
-		glVertex2f(mid_x, self._gl_position[0][1])
-
-		glColor4f(self.bg_colors[1][0], self.bg_colors[1][1], self.bg_colors[1][2], self.bg_colors[1][3])
-		glVertex2f(self._gl_position[1][0], self._gl_position[1][1])
-
-		glColor4f(self.bg_colors[2][0], self.bg_colors[2][1], self.bg_colors[2][2], self.bg_colors[2][3])
-		glVertex2f(self._gl_position[2][0], self._gl_position[2][1])
-
-		glColor4f(self.bg_colors[3][0], self.bg_colors[3][1], self.bg_colors[3][2], self.bg_colors[3][3])
-		glVertex2f(mid_x, self._gl_position[3][1])
-		glEnd()
+		c1, c2, c3, c4 = self.bg_colors
+		batch.add_quad(mid_x, y0, x1, y1, c1, c2, c3, c4)
 
 		# Draw outline
-		glDisable(GL_POLYGON_OFFSET_FILL)
-
-		r, g, b, a = self.border_color
-		glColor4f(r, g, b, a)
-		glPolygonMode(GL_FRONT, GL_LINE)
-		glLineWidth(self.border)
-
-		glBegin(GL_QUADS)
-		for i in range(4):
-			glVertex2f(self._gl_position[i][0], self._gl_position[i][1])
-
-		glEnd()
-
-		glPolygonMode(GL_FRONT, GL_FILL)
+		if self.border > 0:
+			batch.add_outline(x0, y0, x1, y1, self.border, self.border_color)
 
 		Widget._draw(self)
@@ -0,0 +1,303 @@
+"""
+Everything bgui draws goes through a render backend, which is passed to
+:py:class:`bgui.system.System`. The default backend
+(:py:class:`bgui.render.gl.GLRenderBackend`) draws with OpenGL through bgl or
+PyOpenGL. :py:class:`bgui.render.recording.RecordingRenderBackend` draws
+nothing and records a list of commands instead, which allows the gui to be
+tested and benchmarked without a window or an OpenGL library.
+
+Backends remember the state set through them (see :py:class:`RenderBackend`),
+so calls that wouldn't change anything are skipped.
+
+This module defines the following constants, which have the same values as
+the OpenGL constants of the same name:
+
+*Capabilities*
+	* GL_BLEND
+	* GL_TEXTURE_2D
+	* GL_SCISSOR_TEST
+
+*Blend factors*
+	* GL_ONE
+	* GL_SRC_ALPHA
+	* GL_ONE_MINUS_SRC_ALPHA
+
+*Texture filtering*
+	* GL_NEAREST
+	* GL_LINEAR
+
+*Pixel formats*
+	* GL_RGBA
+	* GL_BGRA
+
+*Polygon modes*
+	* GL_FRONT_AND_BACK
+	* GL_LINE
+	* GL_FILL
+"""
+
+GL_BLEND = 0x0BE2
+GL_TEXTURE_2D = 0x0DE1
+GL_SCISSOR_TEST = 0x0C11
+
+GL_ONE = 1
+GL_SRC_ALPHA = 0x0302
+GL_ONE_MINUS_SRC_ALPHA = 0x0303
+
+GL_NEAREST = 0x2600
+GL_LINEAR = 0x2601
+
+GL_RGBA = 0x1908
+GL_BGRA = 0x80E1
+
+GL_FRONT_AND_BACK = 0x0408
+GL_LINE = 0x1B01
+GL_FILL = 0x1B02
+
+
+class RenderBackend:
+	"""The interface bgui draws through. Subclasses implement the methods that
+	raise NotImplementedError, along with the state methods starting with an
+	underscore, which are only called when the state actually changes.
+
+	Anything that changes the state without going through the backend (such
+	as a text library) needs to be followed by a call to :py:meth:`invalidate`.
+	"""
+
+	#: Whether :py:meth:`update_texture` is supported (needed for texture atlases)
+	supports_texture_updates = False
+
+	#: Whether render targets are supported (needed for BGUI_RENDER_CACHE)
+	supports_render_targets = False
+
+	def __init__(self):
+		#: The number of state changes skipped since the start of the frame
+		self.saved_calls = 0
+
+		#: The number of state changes made since the start of the frame
+		self.state_changes = 0
+
+		#: The number of textures bound since the start of the frame
+		self.texture_binds = 0
+
+		#: Whether colors are being drawn into a texture that stores them
+		#: premultiplied by their alpha (see :py:meth:`blend_func`)
+		self.premultiply_alpha = False
+
+		self.invalidate()
+
+	def invalidate(self):
+		"""Forget the remembered state, so the next call of each kind is always made"""
+
+		self._cur_enabled = {}
+		self._cur_blend = None
+		self._cur_texture = None
+		self._cur_polygon_mode = {}
+		self._cur_line_width = None
+
+	# State
+
+	def enable(self, cap):
+		if self._cur_enabled.get(cap) is True:
+			self.saved_calls += 1
+			return
+
+		self._enable(cap)
+		self.state_changes += 1
+		self._cur_enabled[cap] = True
+
+	def disable(self, cap):
+		if self._cur_enabled.get(cap) is False:
+			self.saved_calls += 1
+			return
+
+		self._disable(cap)
+		self.state_changes += 1
+		self._cur_enabled[cap] = False
+
+	def blend_func(self, sfactor, dfactor):
+		"""Set how colors are blended. While :py:attr:`premultiply_alpha` is
+		set, (GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA) blends alpha with
+		(GL_ONE, GL_ONE_MINUS_SRC_ALPHA) instead, so the alpha isn't squared."""
+
+		if self.premultiply_alpha and sfactor == GL_SRC_ALPHA:
+			self.blend_func_separate(sfactor, dfactor, GL_ONE, dfactor)
+			return
+
+		self.blend_func_separate(sfactor, dfactor, sfactor, dfactor)
+
+	def blend_func_separate(self, src_rgb, dst_rgb, src_alpha, dst_alpha):
+		"""Set how colors are blended, with different factors for the alpha channel"""
+
+		blend = (src_rgb, dst_rgb, src_alpha, dst_alpha)
+		if self._cur_blend == blend:
+			self.saved_calls += 1
+			return
+
+		if src_rgb == src_alpha and dst_rgb == dst_alpha:
+			self._blend_func(src_rgb, dst_rgb)
+		else:
+			self._blend_func_separate(src_rgb, dst_rgb, src_alpha, dst_alpha)
+		self.state_changes += 1
+		self._cur_blend = blend
+
+	def bind_texture(self, texture):
+		"""Bind a texture to GL_TEXTURE_2D (0 unbinds the current texture)"""
+
+		if self._cur_texture == texture:
+			self.saved_calls += 1
+			return
+
+		self._bind_texture(texture)
+		self.state_changes += 1
+		self.texture_binds += 1
+		self._cur_texture = texture
+
+	def polygon_mode(self, face, mode):
+		if self._cur_polygon_mode.get(face) == mode:
+			self.saved_calls += 1
+			return
+
+		self._polygon_mode(face, mode)
+		self.state_changes += 1
+		self._cur_polygon_mode[face] = mode
+
+	def line_width(self, width):
+		if self._cur_line_width == width:
+			self.saved_calls += 1
+			return
+
+		self._line_width(width)
+		self.state_changes += 1
+		self._cur_line_width = width
+
+	def _enable(self, cap):
+		raise NotImplementedError
+
+	def _disable(self, cap):
+		raise NotImplementedError
+
+	def _blend_func(self, sfactor, dfactor):
+		raise NotImplementedError
+
+	def _blend_func_separate(self, src_rgb, dst_rgb, src_alpha, dst_alpha):
+		raise NotImplementedError
+
+	def _bind_texture(self, texture):
+		raise NotImplementedError
+
+	def _polygon_mode(self, face, mode):
+		raise NotImplementedError
+
+	def _line_width(self, width):
+		raise NotImplementedError
+
+	def _forget_texture(self, texture):
+		# Subclasses call this when they delete a texture, since its id can be reused
+		if self._cur_texture == texture:
+			self._cur_texture = None
+
+	# Frames
+
+	def get_viewport(self):
+		"""Returns the current viewport as an [x, y, width, height] list"""
+		raise NotImplementedError
+
+	def begin_frame(self, viewport):
+		"""Get ready to draw the gui over the viewport. Subclasses should call
+		this before changing any state.
+
+		:param viewport: the viewport returned by :py:meth:`get_viewport`
+		"""
+
+		self.invalidate()
+		self.saved_calls = 0
+		self.state_changes = 0
+		self.texture_binds = 0
+
+	def end_frame(self):
+		"""Restore the state from before :py:meth:`begin_frame`. Subclasses
+		should call this after restoring the state.
+		"""
+
+		self.invalidate()
+
+	# Drawing
+
+	def set_color(self, color):
+		"""Set the color used for text
+
+		:param color: an (r, g, b, a) sequence
+		"""
+		raise NotImplementedError
+
+	def scissor(self, x, y, width, height):
+		"""Set the scissor box (in window coordinates) used while GL_SCISSOR_TEST is enabled"""
+		raise NotImplementedError
+
+	def draw_quads(self, data):
+		"""Draw quads with the current blending and texture
+
+		:param data: a flat list with 8 values (x, y, u, v, r, g, b, a) for each
+			vertex, and 4 vertices for each quad
+		"""
+		raise NotImplementedError
+
+	def draw_text(self, textlib, fontid, x, y, text):
+		"""Draw a line of text with the current color
+
+		:param textlib: the text library to draw with
+		:param fontid: the font to use (as returned by the text library's load())
+		"""
+		raise NotImplementedError
+
+	# Textures
+
+	def create_texture(self, interp_mode):
+		"""Create an empty texture
+
+		:param interp_mode: the filtering to use for the texture (GL_NEAREST or GL_LINEAR)
+		:rtype: the id of the texture
+		"""
+		raise NotImplementedError
+
+	def delete_texture(self, texture):
+		"""Delete a texture created with :py:meth:`create_texture`"""
+		raise NotImplementedError
+
+	def set_texture_filter(self, texture, interp_mode):
+		raise NotImplementedError
+
+	def upload_texture(self, texture, width, height, format, data):
+		"""Replace a texture's image
+
+		:param format: the format of the pixels in data (GL_RGBA or GL_BGRA)
+		:param data: the pixels (as unsigned bytes), or None for an empty (transparent) image
+		"""
+		raise NotImplementedError
+
+	def update_texture(self, texture, x, y, width, height, format, data):
+		"""Replace part of a texture's image (see :py:attr:`supports_texture_updates`)"""
+		raise NotImplementedError
+
+	# Render targets
+
+	def create_render_target(self, width, height):
+		"""Create an offscreen target to draw into (see :py:attr:`supports_render_targets`)
+
+		:rtype: a (target, texture) tuple, the texture holds what was drawn into the target
+		"""
+		raise NotImplementedError
+
+	def delete_render_target(self, target, texture):
+		raise NotImplementedError
+
+	def begin_render_target(self, target, rect):
+		"""Draw into a render target until :py:meth:`end_render_target`. These can be nested.
+
+		:param rect: the (x0, y0, x1, y1) area of the gui that the target covers
+		"""
+		raise NotImplementedError
+
+	def end_render_target(self):
+		raise NotImplementedError
@@ -0,0 +1,252 @@
+"""
+The OpenGL render backend. This draws with bgl inside of Blender, and with
+PyOpenGL (along with PyQt4) otherwise.
+
+Batched quads are drawn from an interleaved vertex array with PyOpenGL, and in
+a single glBegin()/glEnd() block with bgl.
+"""
+
+from ..gl_utils import *
+from . import RenderBackend
+
+USING_VERTEX_ARRAYS = not USING_BGL
+
+if USING_VERTEX_ARRAYS:
+	import ctypes
+
+try:
+	glTexSubImage2D
+	USING_TEX_SUB_IMAGE = True
+except NameError:
+	USING_TEX_SUB_IMAGE = False
+
+try:
+	glBlendFuncSeparate
+	USING_BLEND_SEPARATE = True
+except NameError:
+	USING_BLEND_SEPARATE = False
+
+try:
+	glGenFramebuffers
+	USING_FBO = True
+except NameError:
+	USING_FBO = False
+
+
+# The number of floats per vertex (x, y, u, v, r, g, b, a)
+_STRIDE = 8
+
+
+class GLRenderBackend(RenderBackend):
+	"""Draws with OpenGL"""
+
+	supports_texture_updates = USING_TEX_SUB_IMAGE
+	supports_render_targets = USING_FBO
+
+	def __init__(self):
+		RenderBackend.__init__(self)
+
+		# The framebuffers and viewports to go back to after each render target
+		self._target_stack = []
+
+	# State
+
+	def _enable(self, cap):
+		glEnable(cap)
+
+	def _disable(self, cap):
+		glDisable(cap)
+
+	def _blend_func(self, sfactor, dfactor):
+		glBlendFunc(sfactor, dfactor)
+
+	def _blend_func_separate(self, src_rgb, dst_rgb, src_alpha, dst_alpha):
+		if USING_BLEND_SEPARATE:
+			glBlendFuncSeparate(src_rgb, dst_rgb, src_alpha, dst_alpha)
+		else:
+			glBlendFunc(src_rgb, dst_rgb)
+
+	def _bind_texture(self, texture):
+		glBindTexture(GL_TEXTURE_2D, texture)
+
+	def _polygon_mode(self, face, mode):
+		glPolygonMode(face, mode)
+
+	def _line_width(self, width):
+		glLineWidth(width)
+
+	# Frames
+
+	def get_viewport(self):
+		return glGetIntegerv(GL_VIEWPORT)
+
+	def begin_frame(self, viewport):
+		RenderBackend.begin_frame(self, viewport)
+
+		# Save the state
+		glPushAttrib(GL_ALL_ATTRIB_BITS)
+
+		# Disable depth test so we always draw over things
+		self.disable(GL_DEPTH_TEST)
+
+		# Disable lighting so everything is shadless
+		self.disable(GL_LIGHTING)
+
+		# Unbinding the texture prevents BGUI frames from somehow picking up on
+		# color of the last used texture
+		self.bind_texture(0)
+
+		# Make sure we're using smooth shading instead of flat
+		glShadeModel(GL_SMOOTH)
+
+		# Setup the matrices
+		glMatrixMode(GL_TEXTURE)
+		glPushMatrix()
+		glLoadIdentity()
+		glMatrixMode(GL_PROJECTION)
+		glPushMatrix()
+		glLoadIdentity()
+		gluOrtho2D(0, viewport[2], 0, viewport[3])
+		glMatrixMode(GL_MODELVIEW)
+		glPushMatrix()
+		glLoadIdentity()
+
+	def end_frame(self):
+		# Reset the state
+		glPopMatrix()
+		glMatrixMode(GL_PROJECTION)
+		glPopMatrix()
+		glMatrixMode(GL_TEXTURE)
+		glPopMatrix()
+		glPopAttrib()
+
+		RenderBackend.end_frame(self)
+
+	# Drawing
+
+	def set_color(self, color):
+		glColor4f(*color)
+
+	def scissor(self, x, y, width, height):
+		glScissor(x, y, width, height)
+
+	def draw_quads(self, data):
+		textured = self._cur_enabled.get(GL_TEXTURE_2D)
+
+		if USING_VERTEX_ARRAYS:
+			array = (ctypes.c_float * len(data))(*data)
+			address = ctypes.addressof(array)
+			size = ctypes.sizeof(ctypes.c_float)
+			stride = _STRIDE * size
+
+			glEnableClientState(GL_VERTEX_ARRAY)
+			glEnableClientState(GL_COLOR_ARRAY)
+			glVertexPointer(2, GL_FLOAT, stride, array)
+			glColorPointer(4, GL_FLOAT, stride, ctypes.c_void_p(address + 4 * size))
+
+			if textured:
+				glEnableClientState(GL_TEXTURE_COORD_ARRAY)
+				glTexCoordPointer(2, GL_FLOAT, stride, ctypes.c_void_p(address + 2 * size))
+
+			glDrawArrays(GL_QUADS, 0, len(data) // _STRIDE)
+
+			if textured:
+				glDisableClientState(GL_TEXTURE_COORD_ARRAY)
+			glDisableClientState(GL_COLOR_ARRAY)
+			glDisableClientState(GL_VERTEX_ARRAY)
+		else:
+			glBegin(GL_QUADS)
+			if textured:
+				for i in range(0, len(data), _STRIDE):
+					glColor4f(data[i + 4], data[i + 5], data[i + 6], data[i + 7])
+					glTexCoord2f(data[i + 2], data[i + 3])
+					glVertex2f(data[i], data[i + 1])
+			else:
+				for i in range(0, len(data), _STRIDE):
+					glColor4f(data[i + 4], data[i + 5], data[i + 6], data[i + 7])
+					glVertex2f(data[i], data[i + 1])
+			glEnd()
+
+	def draw_text(self, textlib, fontid, x, y, text):
+		textlib.position(fontid, x, y, 0)
+		textlib.draw(fontid, text)
+
+		# The text library sets up its own blending and textures
+		self.invalidate()
+
+	# Textures
+
+	def create_texture(self, interp_mode):
+		texture = glGenTextures(1)
+
+		self.bind_texture(texture)
+		glTexEnvf(GL_TEXTURE_ENV, GL_TEXTURE_ENV_MODE, GL_MODULATE)
+		glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, interp_mode)
+		glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, interp_mode)
+
+		return texture
+
+	def delete_texture(self, texture):
+		glDeleteTextures([texture])
+		self._forget_texture(texture)
+
+	def set_texture_filter(self, texture, interp_mode):
+		self.bind_texture(texture)
+		glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, interp_mode)
+		glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, interp_mode)
+
+	def upload_texture(self, texture, width, height, format, data):
+		self.bind_texture(texture)
+		glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, width, height, 0, format, GL_UNSIGNED_BYTE, data)
+
+	def update_texture(self, texture, x, y, width, height, format, data):
+		self.bind_texture(texture)
+		glTexSubImage2D(GL_TEXTURE_2D, 0, x, y, width, height, format, GL_UNSIGNED_BYTE, data)
+
+	# Render targets
+
+	def create_render_target(self, width, height):
+		texture = self.create_texture(GL_NEAREST)
+		self.upload_texture(texture, width, height, GL_RGBA, None)
+
+		prev_fbo = glGetIntegerv(GL_FRAMEBUFFER_BINDING)[0]
+
+		target = glGenFramebuffers(1)
+		glBindFramebuffer(GL_FRAMEBUFFER, target)
+		glFramebufferTexture2D(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_TEXTURE_2D, texture, 0)
+		glBindFramebuffer(GL_FRAMEBUFFER, prev_fbo)
+
+		return target, texture
+
+	def delete_render_target(self, target, texture):
+		glDeleteFramebuffers([target])
+		self.delete_texture(texture)
+
+	def begin_render_target(self, target, rect):
+		x0, y0, x1, y1 = rect
+
+		# Render targets can be nested, so save the current one rather than assuming the screen
+		self._target_stack.append((glGetIntegerv(GL_FRAMEBUFFER_BINDING)[0], glGetIntegerv(GL_VIEWPORT)))
+
+		glBindFramebuffer(GL_FRAMEBUFFER, target)
+		glViewport(0, 0, x1 - x0, y1 - y0)
+
+		glMatrixMode(GL_PROJECTION)
+		glPushMatrix()
+		glLoadIdentity()
+		gluOrtho2D(x0, x1, y0, y1)
+		glMatrixMode(GL_MODELVIEW)
+
+		self.disable(GL_SCISSOR_TEST)
+		glClearColor(0, 0, 0, 0)
+		glClear(GL_COLOR_BUFFER_BIT)
+
+	def end_render_target(self):
+		prev_fbo, prev_viewport = self._target_stack.pop()
+
+		glMatrixMode(GL_PROJECTION)
+		glPopMatrix()
+		glMatrixMode(GL_MODELVIEW)
+
+		glBindFramebuffer(GL_FRAMEBUFFER, prev_fbo)
+		glViewport(*prev_viewport)
@@ -0,0 +1,146 @@
+"""
+A render backend that records what would have been drawn instead of drawing
+it. It doesn't need OpenGL (or a window), so it can be used to test and
+benchmark a gui on any machine::
+
+	backend = RecordingRenderBackend(800, 600)
+	system = bgui.System(HeadlessTextLibrary(), backend=backend)
+	...
+	system.render()
+	print(backend.count('draw_quads'), "draw calls")
+
+Each command is a tuple starting with the name of the backend method that was
+called, followed by its arguments. Only calls that reach the backend are
+recorded, so redundant state changes that were skipped don't show up (see
+:py:attr:`bgui.render.RenderBackend.saved_calls`). Pixel data is not
+recorded, and quads are recorded as the number of quads drawn. The commands
+are cleared at the start of every frame.
+"""
+
+from . import RenderBackend, GL_SCISSOR_TEST
+import itertools
+
+
+class RecordingRenderBackend(RenderBackend):
+	"""Records draw commands without drawing anything"""
+
+	supports_texture_updates = True
+	supports_render_targets = True
+
+	def __init__(self, width=800, height=600):
+		"""
+		:param width: the width of the pretend viewport
+		:param height: the height of the pretend viewport
+		"""
+
+		RenderBackend.__init__(self)
+
+		#: The pretend viewport as an [x, y, width, height] list, change this to simulate a resize
+		self.viewport = [0, 0, width, height]
+
+		#: The commands recorded since the start of the last frame (or since the
+		#: backend was created, before the first frame)
+		self.commands = []
+
+		self._ids = itertools.count(1)
+
+	def clear(self):
+		"""Forget the recorded commands"""
+		self.commands = []
+
+	def count(self, name):
+		"""Returns the number of times a command was recorded
+
+		:param name: the name of the command (such as 'draw_quads')
+		"""
+
+		return sum(1 for i in self.commands if i[0] == name)
+
+	# State
+
+	def _enable(self, cap):
+		self.commands.append(('enable', cap))
+
+	def _disable(self, cap):
+		self.commands.append(('disable', cap))
+
+	def _blend_func(self, sfactor, dfactor):
+		self.commands.append(('blend_func', sfactor, dfactor))
+
+	def _blend_func_separate(self, src_rgb, dst_rgb, src_alpha, dst_alpha):
+		self.commands.append(('blend_func_separate', src_rgb, dst_rgb, src_alpha, dst_alpha))
+
+	def _bind_texture(self, texture):
+		self.commands.append(('bind_texture', texture))
+
+	def _polygon_mode(self, face, mode):
+		self.commands.append(('polygon_mode', face, mode))
+
+	def _line_width(self, width):
+		self.commands.append(('line_width', width))
+
+	# Frames
+
+	def get_viewport(self):
+		return list(self.viewport)
+
+	def begin_frame(self, viewport):
+		RenderBackend.begin_frame(self, viewport)
+		self.commands = [('begin_frame', tuple(viewport))]
+
+	def end_frame(self):
+		self.commands.append(('end_frame',))
+		RenderBackend.end_frame(self)
+
+	# Drawing
+
+	def set_color(self, color):
+		self.commands.append(('set_color', tuple(color)))
+
+	def scissor(self, x, y, width, height):
+		self.commands.append(('scissor', x, y, width, height))
+
+	def draw_quads(self, data):
+		self.commands.append(('draw_quads', len(data) // 32))
+
+	def draw_text(self, textlib, fontid, x, y, text):
+		self.commands.append(('draw_text', fontid, x, y, text))
+
+	# Textures
+
+	def create_texture(self, interp_mode):
+		texture = next(self._ids)
+		self.commands.append(('create_texture', texture, interp_mode))
+		return texture
+
+	def delete_texture(self, texture):
+		self.commands.append(('delete_texture', texture))
+		self._forget_texture(texture)
+
+	def set_texture_filter(self, texture, interp_mode):
+		self.commands.append(('set_texture_filter', texture, interp_mode))
+
+	def upload_texture(self, texture, width, height, format, data):
+		self.commands.append(('upload_texture', texture, width, height, format))
+
+	def update_texture(self, texture, x, y, width, height, format, data):
+		self.commands.append(('update_texture', texture, x, y, width, height, format))
+
+	# Render targets
+
+	def create_render_target(self, width, height):
+		target = next(self._ids)
+		texture = next(self._ids)
+		self.commands.append(('create_render_target', target, texture, width, height))
+		return target, texture
+
+	def delete_render_target(self, target, texture):
+		self.commands.append(('delete_render_target', target, texture))
+		self._forget_texture(texture)
+
+	def begin_render_target(self, target, rect):
+		self.commands.append(('begin_render_target', target, tuple(rect)))
+		self.disable(GL_SCISSOR_TEST)
+
+	def end_render_target(self):
+		self.commands.append(('end_render_target',))
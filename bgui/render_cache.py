@@ -0,0 +1,130 @@
+"""
+Widgets with the BGUI_RENDER_CACHE option are drawn (along with their children)
+into an offscreen texture through a render target. From then on only the
+texture is drawn, as a single quad, until the widget or one of its children
+changes.
+
+Size and position changes, changes to a Label's text, and children being
+added, removed, hidden, shown or reordered (with z_index) are picked up
+automatically. Any other change, such as to a Frame's colors, needs a call to
+:py:meth:`bgui.widget.Widget.invalidate` on the changed widget. Caching works
+best for static panels, since widgets that change every frame (such as a
+blinking TextInput cursor) won't update while they are cached.
+
+The texture stores colors premultiplied by their alpha (see
+:py:attr:`bgui.render.RenderBackend.premultiply_alpha`), so translucent widgets
+look the same whether they are cached or not.
+
+If the render backend doesn't support render targets (such as OpenGL without
+framebuffer objects) the widgets are drawn normally.
+"""
+
+from .render import GL_BLEND, GL_TEXTURE_2D, GL_ONE, GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA
+import math
+
+
+class RenderCache:
+	"""An offscreen copy of a widget and its children"""
+
+	def __init__(self, backend):
+		"""
+		:param backend: the :py:class:`bgui.render.RenderBackend` to draw with
+		"""
+
+		#: Whether the cached texture needs to be redrawn
+		self.dirty = True
+
+		self._backend = backend
+		self._target = None
+		self._tex_id = None
+		self._size = (0, 0)
+		self._rect = None
+
+	def __del__(self):
+		self.free()
+
+	def free(self):
+		"""Delete the render target and its texture"""
+
+		if self._target is not None:
+			self._backend.delete_render_target(self._target, self._tex_id)
+			self._target = self._tex_id = None
+			self._size = (0, 0)
+
+	def draw(self, widget, system):
+		"""Draw the widget from the cache, redrawing the cache first if needed
+
+		:param widget: the cached widget
+		:param system: the widget's system
+		"""
+
+		# Only the part of the widget that is in the viewport is cached
+		x0, y0, x1, y1 = widget._get_bounds()
+		vx0, vy0, vx1, vy1 = system._view_rect
+
+		x0 = int(math.floor(max(x0, vx0)))
+		y0 = int(math.floor(max(y0, vy0)))
+		x1 = int(math.ceil(min(x1, vx1)))
+		y1 = int(math.ceil(min(y1, vy1)))
+
+		if x1 <= x0 or y1 <= y0:
+			return
+
+		# Anything already batched belongs under the widget
+		system._batch.flush()
+
+		rect = (x0, y0, x1, y1)
+		if self.dirty or rect != self._rect:
+			self._render(widget, system, rect)
+
+		backend = self._backend
+		backend.enable(GL_TEXTURE_2D)
+
+		# The texture's colors have already been multiplied by their alpha
+		backend.enable(GL_BLEND)
+		backend.blend_func(GL_ONE, GL_ONE_MINUS_SRC_ALPHA)
+
+		backend.bind_texture(self._tex_id)
+		backend.draw_quads([
+				x0, y0, 0, 0, 1, 1, 1, 1,
+				x1, y0, 1, 0, 1, 1, 1, 1,
+				x1, y1, 1, 1, 1, 1, 1, 1,
+				x0, y1, 0, 1, 1, 1, 1, 1,
+				])
+
+		backend.blend_func(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+
+	def _render(self, widget, system, rect):
+		x0, y0, x1, y1 = rect
+		width = x1 - x0
+		height = y1 - y0
+
+		if (width, height) != self._size:
+			self.free()
+			self._target, self._tex_id = self._backend.create_render_target(width, height)
+			self._size = (width, height)
+
+		# Draw into the texture instead of the screen
+		self._backend.begin_render_target(self._target, rect)
+
+		# Clipping and culling work in the texture's area instead of the viewport's
+		saved = system._viewport, system._view_rect, system._clip_rect
+		system._viewport = (-x0, -y0, width, height)
+		system._view_rect = system._clip_rect = rect
+
+		# Blend alpha so the texture ends up premultiplied, instead of with its alpha squared
+		premultiply_alpha = self._backend.premultiply_alpha
+		self._backend.premultiply_alpha = True
+
+		try:
+			widget._draw()
+			system._batch.flush()
+		finally:
+			system._viewport, system._view_rect, system._clip_rect = saved
+			self._backend.premultiply_alpha = premultiply_alpha
+
+			self._backend.end_render_target()
+			system._set_clip(system._clip_rect)
+
+		self._rect = rect
+		self.dirty = False
@@ -0,0 +1,131 @@
+# This module provides the spatial index the system uses to find the widgets
+# under the mouse without testing every widget in the tree
+
+
+class SpatialGrid:
+	"""A uniform grid of buckets that maps screen positions to the widgets
+	overlapping them. Widgets are added when they are attached to a parent,
+	moved between buckets by the layout pass and removed along with their
+	parent widget.
+	"""
+
+	def __init__(self, cell_size=64, max_cells=64):
+		"""
+		:param cell_size: the width and height of a grid cell in pixels
+		:param max_cells: widgets covering more cells than this are kept in a
+			separate list that is checked for every query instead
+		"""
+
+		self.cell_size = cell_size
+		self.max_cells = max_cells
+
+		self._cells = {}
+		self._large = set()
+		self._ranges = {}
+
+	def __len__(self):
+		return len(self._ranges)
+
+	def add(self, widget):
+		"""Start tracking a widget. It is placed in the grid on its first update().
+
+		:param widget: the widget to add
+		"""
+
+		self._ranges.setdefault(widget, None)
+
+	def update(self, widget, rect):
+		"""Move a tracked widget to the cells covered by rect. Widgets that
+		are not being tracked are ignored.
+
+		:param widget: the widget to update
+		:param rect: the widget's bounds as an (x0, y0, x1, y1) tuple
+		"""
+
+		try:
+			old = self._ranges[widget]
+		except KeyError:
+			return
+
+		size = self.cell_size
+		x0, y0, x1, y1 = rect
+		new = (int(min(x0, x1) // size), int(min(y0, y1) // size),
+				int(max(x0, x1) // size), int(max(y0, y1) // size))
+
+		if new == old:
+			return
+
+		if old is not None:
+			self._unlink(widget, old)
+		self._link(widget, new)
+		self._ranges[widget] = new
+
+	def remove(self, widget):
+		"""Stop tracking a widget
+
+		:param widget: the widget to remove
+		"""
+
+		old = self._ranges.pop(widget, None)
+		if old is not None:
+			self._unlink(widget, old)
+
+	def remove_tree(self, widget):
+		"""Stop tracking a widget and all of its children
+
+		:param widget: the root of the widgets to remove
+		"""
+
+		stack = [widget]
+		while stack:
+			widget = stack.pop()
+			self.remove(widget)
+			stack.extend(widget.children.values())
+
+	def query(self, x, y):
+		"""Returns the widgets whose cells cover the point (x, y). The caller
+		still needs to test the point against each widget's bounds.
+
+		:param x: the x position in pixels
+		:param y: the y position in pixels
+		:rtype: set
+		"""
+
+		size = self.cell_size
+		cell = self._cells.get((int(x // size), int(y // size)))
+
+		if cell:
+			return cell | self._large if self._large else set(cell)
+
+		return set(self._large)
+
+	def _link(self, widget, cells):
+		cx0, cy0, cx1, cy1 = cells
+
+		if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > self.max_cells:
+			self._large.add(widget)
+			return
+
+		buckets = self._cells
+		for cx in range(cx0, cx1 + 1):
+			for cy in range(cy0, cy1 + 1):
+				bucket = buckets.get((cx, cy))
+				if bucket is None:
+					buckets[cx, cy] = {widget}
+				else:
+					bucket.add(widget)
+
+	def _unlink(self, widget, cells):
+		cx0, cy0, cx1, cy1 = cells
+
+		if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > self.max_cells:
+			self._large.discard(widget)
+			return
+
+		buckets = self._cells
+		for cx in range(cx0, cx1 + 1):
+			for cy in range(cy0, cy1 + 1):
+				bucket = buckets[cx, cy]
+				bucket.discard(widget)
+				if not bucket:
+					del buckets[cx, cy]
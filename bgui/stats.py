@@ -0,0 +1,178 @@
+"""
+Frame statistics for finding out where the gui's frame time goes. Every
+:py:class:`bgui.system.System` has a :py:class:`FrameStats` as its
+:py:attr:`~bgui.system.System.stats`, which is turned off by default::
+
+	system.stats.enabled = True
+	...
+	print(system.stats.average('draw_ms'), system.stats.percentile('frame_ms', 95))
+
+While it is off the system doesn't look at the clock, so it can be left in
+production code. Once it is on, a sample is recorded at the end of every
+render() with the following values:
+
+*Timings (in milliseconds)*
+	* input_ms: time spent in update_mouse() and update_keyboard() since the last frame
+	* anims_ms: time spent updating animations and tweens
+	* layout_ms: time spent resolving size and position changes
+	* draw_ms: time spent drawing widgets
+	* frame_ms: the total time of render() (not counting input)
+
+*Counters*
+	* widgets_visited: widgets the draw looked at (including hidden and culled ones)
+	* widgets_drawn: widgets that were drawn
+	* culled_widgets: see :py:attr:`bgui.system.System.culled_widgets`
+	* draw_calls: see :py:attr:`bgui.system.System.draw_calls`
+	* text_draw_calls: lines of text drawn (including outlines)
+	* texture_binds: textures bound through the render backend
+	* gl_calls: state changes, draw calls and text draws that reached the render backend
+	* saved_gl_calls: see :py:attr:`bgui.system.System.saved_gl_calls`
+
+Only the last :py:attr:`FrameStats.window` samples are kept.
+"""
+
+from collections import deque
+import math
+
+
+#: The names of the values recorded for each frame, in the order of the summary
+NAMES = (
+	'input_ms',
+	'anims_ms',
+	'layout_ms',
+	'draw_ms',
+	'frame_ms',
+	'widgets_visited',
+	'widgets_drawn',
+	'culled_widgets',
+	'draw_calls',
+	'text_draw_calls',
+	'texture_binds',
+	'gl_calls',
+	'saved_gl_calls',
+	)
+
+
+class FrameStats:
+	"""Rolling statistics of the last few frames"""
+
+	def __init__(self, window=120):
+		"""
+		:param window: the number of frames to keep
+		"""
+
+		#: Whether samples are recorded, this is checked once per render() and input update
+		self.enabled = False
+
+		self._samples = deque(maxlen=window)
+
+		# Input time since the last sample
+		self._input_ms = 0.0
+
+	@property
+	def window(self):
+		"""The number of frames kept, changing this forgets the recorded frames"""
+		return self._samples.maxlen
+
+	@window.setter
+	def window(self, value):
+		self._samples = deque(maxlen=value)
+
+	def __len__(self):
+		"""The number of frames recorded"""
+		return len(self._samples)
+
+	def reset(self):
+		"""Forget the recorded frames"""
+
+		self._samples.clear()
+		self._input_ms = 0.0
+
+	def _add_input_time(self, ms):
+		self._input_ms += ms
+
+	def _record(self, sample):
+		sample['input_ms'] = self._input_ms
+		self._input_ms = 0.0
+		self._samples.append(sample)
+
+	def _values(self, name):
+		if name not in NAMES:
+			raise KeyError("%r is not a frame statistic" % (name,))
+		return [i[name] for i in self._samples]
+
+	def last(self, name):
+		"""Returns the value from the last frame (or None if no frames were recorded)
+
+		:param name: the name of the value (see :py:data:`NAMES`)
+		"""
+
+		values = self._values(name)
+		return values[-1] if values else None
+
+	def average(self, name):
+		"""Returns the average value over the recorded frames (or None if no frames were recorded)
+
+		:param name: the name of the value (see :py:data:`NAMES`)
+		"""
+
+		values = self._values(name)
+		return sum(values) / len(values) if values else None
+
+	def percentile(self, name, percent):
+		"""Returns the value that percent of the recorded frames are at or
+		below (or None if no frames were recorded)
+
+		:param name: the name of the value (see :py:data:`NAMES`)
+		:param percent: a percentage between 0 and 100
+		"""
+
+		values = sorted(self._values(name))
+		if not values:
+			return None
+
+		# Nearest rank
+		rank = int(math.ceil(percent / 100 * len(values)))
+		return values[min(max(rank, 1), len(values)) - 1]
+
+	def histogram(self, name, bins=10):
+		"""Returns how the recorded values are spread out, as a list of
+		(low, high, count) tuples covering the range of the values
+
+		:param name: the name of the value (see :py:data:`NAMES`)
+		:param bins: the number of equally sized ranges to count values in
+		"""
+
+		values = self._values(name)
+		if not values:
+			return []
+
+		low = min(values)
+		width = (max(values) - low) / bins
+		counts = [0] * bins
+
+		for value in values:
+			i = int((value - low) / width) if width else 0
+			counts[min(i, bins - 1)] += 1
+
+		return [(low + width * i, low + width * (i + 1), count) for i, count in enumerate(counts)]
+
+	def summary(self):
+		"""Returns a dictionary with the average, 50th, 95th and 99th
+		percentile and maximum of every value over the recorded frames
+
+		:rtype: dict
+		"""
+
+		summary = {}
+		for name in NAMES:
+			values = self._values(name)
+			summary[name] = {
+				'average': self.average(name),
+				'p50': self.percentile(name, 50),
+				'p95': self.percentile(name, 95),
+				'p99': self.percentile(name, 99),
+				'max': max(values) if values else None,
+				}
+
+		return summary
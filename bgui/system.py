@@ -1,7 +1,23 @@
-from .gl_utils import *
-from .widget import Widget, BGUI_MOUSE_NONE, BGUI_NO_NORMALIZE, BGUI_NO_THEME
+from .widget import Widget, WeakMethod, _draw_key, BGUI_MOUSE_NONE, BGUI_MOUSE_CLICK, BGUI_NO_NORMALIZE, \
+	BGUI_NO_THEME, BGUI_NO_FOCUS
 from .theme import Theme
+from .spatial_index import SpatialGrid
+from .tween import TweenEngine
+from .batch import QuadBatch
+from .atlas import TextureAtlas
+from .stats import FrameStats
+from .render import GL_SCISSOR_TEST
+from operator import attrgetter
+import itertools
+import math
 import weakref
+import time
+
+try:
+	from .render.gl import GLRenderBackend
+	USING_GL = True
+except ImportError:
+	USING_GL = False
 
 
 class System(Widget):
@@ -12,21 +28,91 @@ class System(Widget):
 
 	normalize_text = True
 
-	def __init__(self, textlib, theme=None):
+	#: Whether keys the focused widget doesn't use are passed on to its parents
+	bubble_keys = True
+
+	#: Widgets (including their children) smaller than this many pixels in
+	#: both directions are not drawn
+	cull_threshold = 0
+
+	def __init__(self, textlib, theme=None, backend=None):
 		"""
+		:param textlib: the text library to use (see :py:mod:`bgui.text`)
 		:param theme: the path to a theme directory
+		:param backend: the render backend to draw with (see :py:mod:`bgui.render`), defaults to OpenGL
 
 		"""
 
+		if backend is None:
+			if not USING_GL:
+				raise RuntimeError("OpenGL is not available, a render backend is needed (see bgui.render)")
+			backend = GLRenderBackend()
+
+		#: The :py:class:`bgui.render.RenderBackend` everything is drawn with
+		self.backend = backend
+
 		# Size and positions for children to use.
 		# The size will the the view port size and
 		# the position will be the top left of the screen
 
 		# Get some viewport info
-		view = glGetIntegerv(GL_VIEWPORT)
+		view = backend.get_viewport()
 
 		self.textlib = textlib
 
+		# Widgets waiting on the next layout pass
+		self._layout_queue = []
+		self._layout_batches = 0
+
+		# Used to find the widgets under the mouse
+		self._spatial_index = SpatialGrid()
+		self._widget_counter = itertools.count()
+		self._hovered = weakref.WeakSet()
+
+		# Handlers for keys that no widget used
+		self._key_handlers = []
+
+		# Running animations (as (widget, animation) pairs) and tweens for all widgets
+		self._animations = []
+		self._tweens = TweenEngine()
+
+		#: The timestamp (from time.time()) used for the last animation update
+		self.frame_time = time.time()
+
+		#: The number of widgets (not counting their children) that were
+		#: skipped during the last render() for being off screen, clipped or
+		#: smaller than cull_threshold
+		self.culled_widgets = 0
+
+		# Collects the quads drawn by widgets so they can be drawn together
+		self._batch = QuadBatch(backend)
+
+		#: The number of draw calls used for batched quads during the last render()
+		self.draw_calls = 0
+
+		#: The number of redundant OpenGL state changes that were skipped during the last render()
+		self.saved_gl_calls = 0
+
+		#: The :py:class:`bgui.stats.FrameStats` of the last few frames, set
+		#: stats.enabled to True to start recording them
+		self.stats = FrameStats()
+
+		# Counted while drawing for the stats
+		self._drawn_widgets = 0
+		self._visited_widgets = 0
+		self._text_draws = 0
+
+		#: The :py:class:`bgui.atlas.TextureAtlas` small images are packed into, set
+		#: this to None before creating any images to give every image its own texture
+		self.atlas = TextureAtlas(backend) if backend.supports_texture_updates else None
+
+		# Widgets that have been drawn into a render cache
+		self._cached_widgets = weakref.WeakSet()
+
+		# The viewport and the area children are currently being clipped to
+		self._viewport = tuple(view)
+		self._view_rect = self._clip_rect = (0, 0, view[2], view[3])
+
 		# Theming
 		self._system = weakref.ref(self)
 		self.theme = Theme(theme)
@@ -46,6 +132,35 @@ class System(Widget):
 	def focused_widget(self, value):
 		self._focused_widget = weakref.ref(value)
 
+	def update_layout(self):
+		"""Resolves any pending size and position changes. This is called
+		automatically by render(), so it only needs to be called directly
+		when up-to-date geometry is needed before then.
+
+		:rtype: None
+		"""
+
+		queue = self._layout_queue
+		if not queue:
+			return
+
+		self._layout_queue = []
+
+		# Parents are laid out before their children, and laying out a widget
+		# also lays out its children, so every widget is only updated once
+		queue.sort(key=attrgetter('_depth'))
+		for widget in queue:
+			if widget._layout_dirty:
+				try:
+					widget._update_layout()
+
+					# Redraw any cached drawings the subtree is part of
+					if self._cached_widgets:
+						widget.invalidate()
+				except ReferenceError:
+					# The widget was removed along with its parent
+					pass
+
 	def update_mouse(self, pos, click_state=BGUI_MOUSE_NONE):
 		"""Updates the system's mouse data
 
@@ -55,19 +170,189 @@ class System(Widget):
 
 		"""
 
+		if not self.stats.enabled:
+			self._update_mouse(pos, click_state)
+			return
+
+		start = time.perf_counter()
+		self._update_mouse(pos, click_state)
+		self.stats._add_input_time((time.perf_counter() - start) * 1000)
+
+	def _update_mouse(self, pos, click_state):
 		self.cursor_pos = pos
 
+		# Make sure the spatial index matches the current layout
+		self.update_layout()
+
+		hits = self._hit_test(pos)
+
+		# Let widgets the mouse has left know about it
+		for widget in list(self._hovered):
+			if widget not in hits:
+				widget._update_hover(False)
+
 		Widget._handle_mouse(self, pos, click_state)
+		for widget in hits:
+			widget._handle_mouse(pos, click_state)
+
+		self._hovered = weakref.WeakSet(widget for widget in hits if widget._hover)
+
+		# Give focus to the top-most widget that can take it
+		if click_state == BGUI_MOUSE_CLICK and not self.lock_focus:
+			focus = self
+			branch = [self]
+			for widget in hits:
+				# Hidden and frozen widgets don't block the widgets below them
+				if not widget.visible or widget.frozen:
+					continue
+
+				# Stop at the end of the top-most branch, unless nothing on it
+				# could take focus (such as a BGUI_NO_FOCUS overlay), in which
+				# case the widgets below it get a chance
+				ended = False
+				while branch[-1]._order != widget._parent._order:
+					if branch.pop() is focus:
+						ended = True
+				if ended:
+					break
+				branch.append(widget)
+
+				if not widget.options & BGUI_NO_FOCUS:
+					focus = widget
+
+			self.focused_widget = focus
+
+	def _hit_test(self, pos):
+		"""Returns the widgets under pos that should receive mouse events. A
+		widget can only receive events if its parent did and is not hidden or
+		frozen. The widgets are returned parents first, walking siblings in
+		the reverse of their drawing order so the top-most widget is found first.
+
+		:param pos: the mouse position
+		:rtype: list
+		"""
+
+		x, y = pos
+
+		# Widgets whose children can receive events, and the children that do
+		open_widgets = {self._order}
+		children = {}
+
+		for widget in sorted(self._spatial_index.query(x, y), key=attrgetter('_depth')):
+			x0, y0, x1, y1 = widget._rect
+			if not (x0 <= x <= x1 and y0 <= y <= y1):
+				continue
+
+			parent_order = widget._parent._order
+			if parent_order not in open_widgets:
+				continue
+
+			children.setdefault(parent_order, []).append(widget)
+			if widget.visible and not widget.frozen:
+				open_widgets.add(widget._order)
+
+		# Flatten into a depth first walk. Widgets are popped off the end of
+		# the stack, so siblings are pushed bottom-most first.
+		hits = []
+		stack = sorted(children.get(self._order, ()), key=_draw_key)
+		while stack:
+			widget = stack.pop()
+			hits.append(widget)
+			if widget._order in children:
+				stack.extend(sorted(children[widget._order], key=_draw_key))
+
+		return hits
 
 	def update_keyboard(self, key, is_shifted):
-		"""Updates the system's keyboard data
+		"""Updates the system's keyboard data. The key is sent to the focused
+		widget, then to its parents (see bubble_keys) and finally to any global
+		key handlers, stopping at the first one to use it.
 
 		:param key: the key being input
 		:param is_shifted: is the shift key held down?
 		:rtype: None
 		"""
 
-		Widget._handle_key(self, key, is_shifted)
+		if not self.stats.enabled:
+			self._update_keyboard(key, is_shifted)
+			return
+
+		start = time.perf_counter()
+		self._update_keyboard(key, is_shifted)
+		self.stats._add_input_time((time.perf_counter() - start) * 1000)
+
+	def _update_keyboard(self, key, is_shifted):
+		widget = self.focused_widget
+		if widget is None:
+			widget = self
+
+		# Send the key to the focused widget, and then up through its parents
+		# until one of them uses it
+		while True:
+			if not widget.frozen and widget._handle_key(key, is_shifted):
+				return
+
+			if not self.bubble_keys or not widget._depth:
+				break
+
+			widget = widget._parent
+
+		for handler in self._key_handlers:
+			if handler(key, is_shifted):
+				return
+
+	def add_key_handler(self, handler):
+		"""Adds a global key handler, such as for keyboard shortcuts. Global
+		handlers are called in the order they were added with any keys that
+		the focused widget (and its parents) didn't use, until one returns True.
+
+		:param handler: a callable taking the key and whether shift is held down
+		:rtype: None
+		"""
+
+		self._key_handlers.append(WeakMethod(handler))
+
+	def remove_key_handler(self, handler):
+		"""Removes a global key handler added with add_key_handler()
+
+		:param handler: the handler to remove
+		:rtype: None
+		"""
+
+		func = getattr(handler, '__func__', handler)
+		owner = getattr(handler, '__self__', None)
+
+		for i, weak in enumerate(self._key_handlers):
+			if weak.f == func and (weak.c is None or weak.c() is owner):
+				del self._key_handlers[i]
+				return
+
+		raise ValueError("%r is not a key handler" % (handler,))
+
+	def _update_anims(self):
+		# Use a single timestamp for every animation in the frame
+		self.frame_time = now = time.time()
+
+		if self._tweens:
+			self._tweens.update(now)
+
+		if not self._animations:
+			return
+
+		running = self._animations
+
+		# Animations started by callbacks are added to the new list
+		self._animations = []
+		running = [i for i in running if i[1].update(now)]
+		running.extend(self._animations)
+		self._animations = running
+
+	def _stop_animations(self, widgets):
+		"""Drop the animations and tweens of widgets that are being removed"""
+
+		ids = {id(i) for i in widgets}
+		self._animations = [i for i in self._animations if id(i[0]) not in ids]
+		self._tweens.remove_targets(widgets)
 
 	def _attach_widget(self, widget):
 		if widget == self:
@@ -75,57 +360,85 @@ class System(Widget):
 
 		Widget._attach_widget(self, widget)
 
+	def _set_clip(self, rect):
+		"""Limits drawing to rect (in the system's coordinates). Passing the
+		viewport's rect turns clipping off."""
+
+		# Anything already batched was drawn with the old clip rect
+		self._batch.flush()
+
+		self._clip_rect = rect
+
+		if rect is self._view_rect:
+			self.backend.disable(GL_SCISSOR_TEST)
+			return
+
+		x0, y0, x1, y1 = rect
+		x = int(math.floor(x0))
+		y = int(math.floor(y0))
+
+		self.backend.enable(GL_SCISSOR_TEST)
+		self.backend.scissor(self._viewport[0] + x, self._viewport[1] + y,
+				max(0, int(math.ceil(x1)) - x), max(0, int(math.ceil(y1)) - y))
+
 	def render(self):
 		"""Renders the GUI system
 
 		:rtype: None
 		"""
 
+		backend = self.backend
+		timing = self.stats.enabled
+		if timing:
+			start = time.perf_counter()
+
 		# Get some viewport info
-		view = glGetIntegerv(GL_VIEWPORT)
+		view = backend.get_viewport()
 
 		# Update the size if the viewport has changed
 		if self.size != [view[2], view[3]]:
 			self.size = [view[2], view[3]]
 
-		# Save the state
-		glPushAttrib(GL_ALL_ATTRIB_BITS)
-
-		# Disable depth test so we always draw over things
-		glDisable(GL_DEPTH_TEST)
-
-		# Disable lighting so everything is shadless
-		glDisable(GL_LIGHTING)
-
-		# Unbinding the texture prevents BGUI frames from somehow picking up on
-		# color of the last used texture
-		glBindTexture(GL_TEXTURE_2D, 0)
-
-		# Make sure we're using smooth shading instead of flat
-		glShadeModel(GL_SMOOTH)
-
-		# Setup the matrices
-		glMatrixMode(GL_TEXTURE)
-		glPushMatrix()
-		glLoadIdentity()
-		glMatrixMode(GL_PROJECTION)
-		glPushMatrix()
-		glLoadIdentity()
-		gluOrtho2D(0, view[2], 0, view[3])
-		glMatrixMode(GL_MODELVIEW)
-		glPushMatrix()
-		glLoadIdentity()
+		backend.begin_frame(view)
 
 		# Update any animations
-		Widget._update_anims(self)
+		self._update_anims()
+		if timing:
+			anims_end = time.perf_counter()
+
+		# Resolve any size and position changes before drawing
+		self.update_layout()
+		if timing:
+			layout_end = time.perf_counter()
+
+		# Start with the whole viewport visible
+		self._viewport = tuple(view)
+		self._view_rect = self._clip_rect = (0, 0, view[2], view[3])
+		self.culled_widgets = 0
+		self._drawn_widgets = self._visited_widgets = self._text_draws = 0
+		self._batch.draw_calls = 0
 
 		# Render the windows
 		Widget._draw(self)
-
-		# Reset the state
-		glPopMatrix()
-		glMatrixMode(GL_PROJECTION)
-		glPopMatrix()
-		glMatrixMode(GL_TEXTURE)
-		glPopMatrix()
-		glPopAttrib()
+		self._batch.flush()
+		self.draw_calls = self._batch.draw_calls
+		self.saved_gl_calls = backend.saved_calls
+
+		backend.end_frame()
+
+		if timing:
+			end = time.perf_counter()
+			self.stats._record({
+				'anims_ms': (anims_end - start) * 1000,
+				'layout_ms': (layout_end - anims_end) * 1000,
+				'draw_ms': (end - layout_end) * 1000,
+				'frame_ms': (end - start) * 1000,
+				'widgets_visited': self._visited_widgets,
+				'widgets_drawn': self._drawn_widgets,
+				'culled_widgets': self.culled_widgets,
+				'draw_calls': self.draw_calls,
+				'text_draw_calls': self._text_draws,
+				'texture_binds': backend.texture_binds,
+				'gl_calls': backend.state_changes + self.draw_calls + self._text_draws,
+				'saved_gl_calls': self.saved_gl_calls,
+				})
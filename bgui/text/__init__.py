@@ -4,10 +4,25 @@ import abc
 #TODO: This just follows the blf interface, which isn't very Pythonic
 
 class TextLibrary:
-	"""Class for handling text drawing.	"""
+	"""Class for handling text drawing.
+
+	Besides the blf style methods, text libraries keep a table of glyph
+	advances for each font and size, so strings can be measured a character
+	at a time with :py:meth:`advances` instead of one dimensions() call per
+	character. Subclasses should call :py:meth:`_set_font_size` from size()
+	so the right table is used, and can override :py:meth:`_glyph_advance`
+	if the library has a faster way to measure a single glyph.
+	"""
 
 	__metaclass__ = abc.ABCMeta
 
+	# (fontid, (size, dpi)) -> {char: advance}, created when first needed so
+	# subclasses don't have to call TextLibrary.__init__()
+	_advance_tables = None
+
+	# The (size, dpi) last set for each font
+	_font_sizes = None
+
 	@abc.abstractmethod
 	def load(self, filename):
 		pass
@@ -26,4 +41,62 @@ class TextLibrary:
 
 	@abc.abstractmethod
 	def size(self, fontid, size, dpi):
-		pass
\ No newline at end of file
+		pass
+
+	def _set_font_size(self, fontid, size, dpi):
+		if self._font_sizes is None:
+			self._font_sizes = {}
+		self._font_sizes[fontid] = (size, dpi)
+
+	def _glyph_advance(self, fontid, char):
+		# Measuring a run of the character averages out any spacing that is
+		# only added to the ends of a string
+		return self.dimensions(fontid, char * 20)[0] / 20
+
+	def advance_table(self, fontid):
+		"""Returns the glyph advances measured so far for the font at its
+		current size, as a dictionary of characters to widths. Missing
+		characters are measured and added by :py:meth:`advances`.
+
+		:param fontid: the font (as returned by load())
+		:rtype: dict
+		"""
+
+		if self._advance_tables is None:
+			self._advance_tables = {}
+
+		key = (fontid, self._font_sizes and self._font_sizes.get(fontid))
+		table = self._advance_tables.get(key)
+		if table is None:
+			table = self._advance_tables[key] = {}
+		return table
+
+	def advances(self, fontid, text):
+		"""Returns the advance (width) of each character of text, measuring
+		each different character only once per font and size
+
+		:param fontid: the font (as returned by load())
+		:param text: the text to measure
+		:rtype: list
+		"""
+
+		table = self.advance_table(fontid)
+		try:
+			return [table[char] for char in text]
+		except KeyError:
+			pass
+
+		for char in set(text).difference(table):
+			table[char] = self._glyph_advance(fontid, char)
+		return [table[char] for char in text]
+
+	def measure_many(self, fontid, texts):
+		"""Returns the dimensions of several strings in the same font
+
+		:param fontid: the font (as returned by load())
+		:param texts: the strings to measure
+		:rtype: a list of (width, height) tuples
+		"""
+
+		dimensions = self.dimensions
+		return [dimensions(fontid, text) for text in texts]
@@ -8,13 +8,13 @@ class BlfTextLibrary(TextLibrary):
 		blf.draw(fontid, text)
 
 	def size(self, fontid, size, dpi):
+		self._set_font_size(fontid, size, dpi)
 		blf.size(fontid, size, dpi)
 
 	def position(self, fontid, x, y, z):
 		blf.position(fontid, x, y, z)
 
 	def dimensions(self, fontid, text):
-		print(fontid, text)
 		return blf.dimensions(fontid, text)
 
 	def load(self, filename):
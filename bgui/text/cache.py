@@ -0,0 +1,110 @@
+from . import TextLibrary
+from collections import OrderedDict
+
+
+class CachedTextLibrary(TextLibrary):
+	"""Wraps another text library and remembers the dimensions of the text it
+	measures, so measuring the same text in the same font and size again
+	doesn't go back to the wrapped library::
+
+		system = bgui.System(CachedTextLibrary(BlfTextLibrary()))
+
+	The least recently used dimensions are forgotten once the cache holds
+	more than max_entries strings, or more than max_chars characters.
+	Everything else is passed straight through to the wrapped library.
+	"""
+
+	def __init__(self, textlib, max_entries=4096, max_chars=262144):
+		"""
+		:param textlib: the text library to wrap
+		:param max_entries: the most strings to remember the dimensions of
+		:param max_chars: the most characters (over all strings) to remember the dimensions of
+		"""
+
+		#: The wrapped text library
+		self.textlib = textlib
+
+		self.max_entries = max_entries
+		self.max_chars = max_chars
+
+		#: The number of dimensions() calls answered from the cache
+		self.hits = 0
+
+		#: The number of dimensions() calls passed on to the wrapped library
+		self.misses = 0
+
+		#: The number of dimensions forgotten to stay within the limits
+		self.evictions = 0
+
+		# (fontid, size, dpi, text) -> dimensions, least recently used first
+		self._cache = OrderedDict()
+		self._chars = 0
+
+		# The (size, dpi) last set for each font
+		self._sizes = {}
+
+	def __len__(self):
+		"""The number of strings in the cache"""
+		return len(self._cache)
+
+	def __getattr__(self, name):
+		# Anything else the wrapped library provides
+		if name == 'textlib':
+			raise AttributeError(name)
+		return getattr(self.textlib, name)
+
+	@property
+	def hit_rate(self):
+		"""The fraction of dimensions() calls answered from the cache"""
+
+		calls = self.hits + self.misses
+		return self.hits / calls if calls else 0.0
+
+	def clear(self):
+		"""Forget the cached dimensions (such as after replacing a font file)"""
+
+		self._cache.clear()
+		self._chars = 0
+
+	def load(self, filename):
+		return self.textlib.load(filename)
+
+	def draw(self, fontid, text):
+		self.textlib.draw(fontid, text)
+
+	def dimensions(self, fontid, text):
+		key = (fontid, self._sizes.get(fontid), text)
+		cache = self._cache
+
+		try:
+			dimensions = cache[key]
+		except KeyError:
+			pass
+		else:
+			cache.move_to_end(key)
+			self.hits += 1
+			return dimensions
+
+		self.misses += 1
+		dimensions = cache[key] = self.textlib.dimensions(fontid, text)
+		self._chars += len(text)
+
+		while len(cache) > self.max_entries or (self._chars > self.max_chars and len(cache) > 1):
+			old = cache.popitem(last=False)[0]
+			self._chars -= len(old[2])
+			self.evictions += 1
+
+		return dimensions
+
+	def advance_table(self, fontid):
+		return self.textlib.advance_table(fontid)
+
+	def advances(self, fontid, text):
+		return self.textlib.advances(fontid, text)
+
+	def position(self, fontid, x, y, z):
+		self.textlib.position(fontid, x, y, z)
+
+	def size(self, fontid, size, dpi):
+		self._sizes[fontid] = (size, dpi)
+		self.textlib.size(fontid, size, dpi)
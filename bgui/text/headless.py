@@ -0,0 +1,32 @@
+from . import TextLibrary
+
+
+class HeadlessTextLibrary(TextLibrary):
+	"""Text library that doesn't need any fonts (or a window). Text is measured
+	as if every character were half as wide as the font size, and nothing is
+	drawn. This is meant for use with
+	:py:class:`bgui.render.recording.RecordingRenderBackend`.
+	"""
+
+	def __init__(self):
+		self._sizes = {}
+
+	def load(self, filename):
+		return filename
+
+	def draw(self, fontid, text):
+		pass
+
+	def dimensions(self, fontid, text):
+		size = self._sizes.get(fontid, 12)
+		return (len(text) * size * 0.5, size)
+
+	def _glyph_advance(self, fontid, char):
+		return self._sizes.get(fontid, 12) * 0.5
+
+	def position(self, fontid, x, y, z):
+		pass
+
+	def size(self, fontid, size, dpi):
+		self._set_font_size(fontid, size, dpi)
+		self._sizes[fontid] = size * dpi / 72
@@ -9,6 +9,9 @@ class QtTextLibrary(TextLibrary):
 		self._gl_widget = gl_widget
 		self._fonts = {0: [QtGui.QFont("Ruthie", 11), (0, 0)]}
 
+		# Font metrics for each font and point size
+		self._metrics = {}
+
 	def load(self, filename):
 		if filename not in self._fonts:
 			fid = QtGui.QFontDatabase.addApplicationFont(filename)
@@ -26,13 +29,31 @@ class QtTextLibrary(TextLibrary):
 
 		self._gl_widget.renderText(s[0], s[1], 0, text, font)
 
+	def _font_metrics(self, fontid):
+		font = self._fonts[fontid][0]
+		key = (fontid, font.pointSize())
+		fm = self._metrics.get(key)
+		if fm is None:
+			fm = self._metrics[key] = QtGui.QFontMetrics(font)
+		return fm
+
 	def dimensions(self, fontid, text):
-		fm = QtGui.QFontMetrics(self._fonts[fontid][0])
+		fm = self._font_metrics(fontid)
 
 		return (fm.width(text), fm.height())
 
+	def _glyph_advance(self, fontid, char):
+		return self._font_metrics(fontid).width(char)
+
+	def measure_many(self, fontid, texts):
+		fm = self._font_metrics(fontid)
+		height = fm.height()
+
+		return [(fm.width(text), height) for text in texts]
+
 	def position(self, fontid, x, y, z):
 		self._fonts[fontid][1] = (x, y)
 
 	def size(self, fontid, size, dpi):
+		self._set_font_size(fontid, size, dpi)
 		self._fonts[fontid][0].setPointSize(size)
\ No newline at end of file
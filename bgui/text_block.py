@@ -1,15 +1,20 @@
 from .widget import Widget, BGUI_OVERFLOW_HIDDEN, BGUI_OVERFLOW_REPLACE, BGUI_OVERFLOW_CALLBACK, BGUI_DEFAULT
 from .label import Label
+from .word_wrap import WordWrapper
 
 
 class TextBlock(Widget):
 	"""Widget for displaying blocks of text"""
+	_batched = True
 
 	theme_section = 'TextBlock'
 	theme_options = {
 				'LabelSubTheme': '',
 				}
 
+	#: A callback for when the text doesn't fit and overflow is BGUI_OVERFLOW_CALLBACK
+	on_overflow = None
+
 	def __init__(self, parent, name=None, text="", font=None, pt_size=None, color=None, aspect=None,
 					size=[1, 1], pos=[0, 0], sub_theme='', overflow=BGUI_OVERFLOW_HIDDEN, options=BGUI_DEFAULT):
 		"""
@@ -31,10 +36,19 @@ class TextBlock(Widget):
 		Widget.__init__(self, parent, name, aspect, size, pos, sub_theme, options)
 
 		self.overflow = overflow
-		self._font = font
-		self._pt_size = pt_size
-		self._color = color
-		self._lines = []
+		self._wrapper = WordWrapper(self.system.textlib)
+
+		# A label that isn't attached to anything holds the font, size, color
+		# and outline of the text, and draws the lines for us
+		self._style = Label(self, "style", "", font, pt_size, color, sub_theme=self.theme['LabelSubTheme'])
+		self._remove_widget(self._style)
+
+		# The wrapped lines as (x, y, text) runs, in pixels from the top left
+		self._runs = []
+		self._line_height = 0
+
+		# The size the lines were last wrapped to
+		self._wrap_width = self._wrap_height = None
 
 		self.text = text
 
@@ -45,65 +59,60 @@ class TextBlock(Widget):
 
 	@text.setter
 	def text(self, value):
+		self._text = value
+		self._wrap()
 
-		# Get rid of any old lines
-		for line in self._lines:
-			self._remove_widget(line)
+	def _wrap(self):
+		"""Break the text into lines"""
 
-		self._lines = []
-		self._text = value
+		self._wrap_width = self._base_width
+		self._wrap_height = self._base_height
+		style = self._style
 
-		# If the string is empty, then we are done
-		if not value:
-			return
-
-		lines = value.split('\n')
-		for i, v in enumerate(lines):
-			lines[i] = v.split()
-
-		cur_line = 0
-		line = Label(self, "tmp", "Mj|", font=self._font, pt_size=self._pt_size, color=self._color, sub_theme=self.theme['LabelSubTheme'])
-		self._remove_widget(line)
-		char_height = line._base_height / self._base_height
-
-		for words in lines:
-			line = Label(self, "lines_" + str(cur_line), "", self._font, self._pt_size, self._color, pos=[0, 1 - (cur_line + 1) * char_height], sub_theme=self.theme['LabelSubTheme'])
-
-			while words:
-				# Try to add a word
-				if line.text:
-					line.text += " " + words[0]
-				else:
-					line.text = words[0]
-
-				# The line is too big, remove the word and create a new line
-				if line._base_width > self._base_width:
-					line.text = line.text[0:-(len(words[0]) + 1)]
-					self._lines.append(line)
-					cur_line += 1
-					line = Label(self, "lines_" + str(cur_line), "", self._font, self._pt_size, self._color, pos=[0, 1 - (cur_line + 1) * char_height], sub_theme=self.theme['LabelSubTheme'])
-				else:
-					# The word fit, so remove it from the words list
-					words.remove(words[0])
-
-			# Add what's left
-			self._lines.append(line)
-			cur_line += 1
+		if self._text:
+			line_height = self._wrapper.line_height(style.fontid, style.pt_size)
+			lines = self._wrapper.wrap(self._text, self._wrap_width, style.fontid, style.pt_size)
+		else:
+			line_height = 0
+			lines = []
 
 		if self.overflow:
-			line_height = char_height * self._base_height
+			max_lines = int(self._base_height / line_height) if line_height else len(lines)
 
-			while self._base_height < len(self._lines) * line_height:
+			if len(lines) > max_lines:
 				if self.overflow == BGUI_OVERFLOW_HIDDEN:
-					self._remove_widget(self._lines[-1])
-					self._lines = self._lines[:-1]
-
+					lines = lines[:max_lines]
 				elif self.overflow == BGUI_OVERFLOW_REPLACE:
-					self._remove_widget(self._lines[0])
-					self._lines = self._lines[1:]
-					for line in self._lines:
-						line.y += char_height
-
+					lines = lines[len(lines) - max_lines:]
 				elif self.overflow == BGUI_OVERFLOW_CALLBACK:
 					if self.on_overflow:
 						self.on_overflow(self)
+
+		self._line_height = line_height
+		self._runs = [(0, -(i + 1) * line_height, text) for i, text in enumerate(lines)]
+
+		# The lines may not fit in the widget
+		self._invalidate_bounds()
+		self.invalidate()
+
+	def _get_draw_rect(self):
+		x0, y0, x1, y1 = self._rect
+
+		# Lines that don't fit are drawn below the widget, and the outline around the text
+		y0 = min(y0, y1 - self._line_height * len(self._runs))
+		outline = self._style.outline_size
+		return (x0 - outline, y0 - outline, x1 + outline, y1 + outline)
+
+	def _draw(self):
+		"""Display the text"""
+
+		# Wrap the text again if the size has changed (the height decides how
+		# many lines fit, the unchanged paragraphs aren't measured again)
+		if self._base_width != self._wrap_width or self._base_height != self._wrap_height:
+			self._wrap()
+
+		if self._runs:
+			x0, y0, x1, y1 = self._gl_rect
+			self._style._draw_lines(self._runs, x0, y1)
+
+		Widget._draw(self)
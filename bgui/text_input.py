@@ -15,7 +15,9 @@ from .widget import Widget, WeakMethod, BGUI_DEFAULT, BGUI_CENTERY, \
 from .key_defs import *
 from .label import Label
 from .frame import Frame
+from .gap_buffer import GapBuffer
 
+import bisect
 import time
 
 # InputText options
@@ -27,6 +29,7 @@ BGUI_INPUT_DEFAULT = BGUI_INPUT_NONE
 
 class TextInput(Widget):
 	"""Widget for getting text input"""
+	_batched = True
 	theme_section = 'TextInput'
 	theme_options = {
 				'TextColor': (1, 1, 1, 1),
@@ -108,6 +111,9 @@ class TextInput(Widget):
 		self.label.position = [px, py]
 		self.fd = self.system.textlib.dimensions(self.label.fontid, self.text_prefix)[0] + fd[1] / 3.2
 
+		# The space left between the text and the right edge
+		self._margin = fd[1] / 3.2
+
 		self.frame.size = [1, 1]
 		self.frame.position = [0, 0]
 
@@ -136,11 +142,14 @@ class TextInput(Widget):
 
 	@property
 	def text(self):
-		return self.label.text
+		# Edits go into the character buffer, and are only joined into a string when needed
+		if self._text is None:
+			self._text = ''.join(self._chars)
+		return self._text
 
 	@text.setter
 	def text(self, value):
-		#setter intended for external access, internal changes can just change self.label.text
+		#setter intended for external access, internal changes go through _replace_text()
 		self.label.text = self.text_prefix + value
 		self._update_char_widths()
 		self.slice = [0, 0]
@@ -166,9 +175,77 @@ class TextInput(Widget):
 
 	#utility functions
 	def _update_char_widths(self):
-		self.char_widths = []
-		for char in self.text:
-			self.char_widths.append(self.system.textlib.dimensions(self.label.fontid, char * 20)[0] / 20)
+		self._text = self.label.text
+		self._label_dirty = False
+		self._chars = GapBuffer(self._text)
+		self.char_widths = GapBuffer(self.system.textlib.advances(self.label.fontid, self._text))
+
+		# The x offset of each caret position (the sum of the widths before
+		# it), only worked out as far as it has been needed since the last edit
+		self._offsets = [0]
+
+		# The range of characters that fit in the box (the label only holds
+		# these), which is scrolled to follow the caret by _update_window()
+		self._first = 0
+		self._last = len(self._chars)
+		self._room = None
+
+	def _replace_text(self, start, end, text):
+		"""Replace the characters from start to end with text. The label is
+		updated the next time the widget is drawn."""
+
+		self._chars.replace(start, end, text)
+		self.char_widths.replace(start, end, self.system.textlib.advances(self.label.fontid, text))
+		del self._offsets[start + 1:]
+		self._text = None
+		self._label_dirty = True
+
+	def _caret_offset(self, index):
+		"""Returns the x offset of the caret position before the character at index"""
+		offsets = self._offsets
+		if index >= len(offsets):
+			widths = self.char_widths
+			total = offsets[-1]
+			for i in range(len(offsets) - 1, index):
+				total += widths[i]
+				offsets.append(total)
+
+		return offsets[index]
+
+	def _visible_width(self):
+		return self._base_width - self.fd - self._margin
+
+	def _update_window(self):
+		"""Scroll the visible range of characters so the caret is in it"""
+
+		widths = self.char_widths
+		count = len(widths)
+		offset = self._caret_offset
+		room = self._room = self._visible_width()
+		caret = self.slice[1] if self.slice_direction == 1 else self.slice[0]
+
+		# Scroll left to the caret, or right until it fits
+		first = min(self._first, caret, count)
+		target = offset(caret) - room
+		while first < caret and offset(first) < target:
+			first += 1
+
+		# Fill the box, and if the text ends first, scroll back to fill the rest of it
+		last = first
+		width = 0
+		while last < count and width + widths[last] <= room:
+			width += widths[last]
+			last += 1
+
+		if last == count:
+			while first > 0 and width + widths[first - 1] <= room:
+				first -= 1
+				width += widths[first]
+
+		if first != self._first or last != self._last:
+			self._first = first
+			self._last = last
+			self._label_dirty = True
 
 	def select_all(self):
 		"""Change the selection to include all of the text"""
@@ -215,8 +292,14 @@ class TextInput(Widget):
 
 	#Selection Code
 	def update_selection(self):
-		left = self.fd + self.system.textlib.dimensions(self.label.fontid, self.text[:self.slice[0]])[0]
-		right = self.fd + self.system.textlib.dimensions(self.label.fontid, self.text[:self.slice[1]])[0]
+		self._update_window()
+
+		# Clip the selection to the visible text
+		offset = self._caret_offset
+		scroll = offset(self._first)
+		room = self._room
+		left = self.fd + min(max(offset(self.slice[0]) - scroll, 0), room)
+		right = self.fd + min(max(offset(self.slice[1]) - scroll, 0), room)
 		self.highlight.position = [left, 1]
 		self.highlight.size = [right - left, self.frame._base_height * 0.8]
 		if self.slice_direction in [0, -1]:
@@ -242,22 +325,26 @@ class TextInput(Widget):
 		self.selection_refresh = 1
 
 	def calc_mouse_cursor(self, pos):
-		adj_pos = pos[0] - (self._base_x + self.fd)
-		find_slice = 0
-		i = 0
-		for entry in self.char_widths:
-			if find_slice + entry > adj_pos:
-				if abs((find_slice + entry) - adj_pos) >= abs(adj_pos - find_slice):
-					return i
-				else:
-					return i + 1
-			else:
-				find_slice += entry
-			i += 1
+		first = self._first
+		last = self._last
+		adj_pos = pos[0] - (self._base_x + self.fd) + self._caret_offset(first)
+		self._caret_offset(last)
+
+		# Find the visible character under the mouse, and then the closest side of it
+		i = bisect.bisect_right(self._offsets, adj_pos, first, last + 1)
+		if i == first:
+			# Moving the caret before the window scrolls it left
+			return max(first - 1, 0)
+		elif i <= last:
+			left, right = self._offsets[i - 1], self._offsets[i]
+			return i - 1 if right - adj_pos >= adj_pos - left else i
+		elif last < len(self.char_widths):
+			# Or after it scrolls it right
+			return last + 1
 
 		self.time = time.time() - 0.501
 
-		return i
+		return last
 
 	def _handle_mouse(self, pos, event):
 		"""Extend function's behaviour by providing focus to unfrozen inactive TextInput,
@@ -325,7 +412,7 @@ class TextInput(Widget):
 		"""Handle any keyboard input"""
 
 		if self != self.system.focused_widget:
-			return
+			return False
 
 		# Try char to int conversion for alphanumeric keys... kinda hacky though
 		try:
@@ -342,20 +429,18 @@ class TextInput(Widget):
 
 		if key == BACKSPACEKEY:
 			if slice_len != 0:
-				self.label.text = self.text[:self.slice[0]] + self.text[self.slice[1]:]
-				self.char_widths = self.char_widths[:self.slice[0]] + self.char_widths[self.slice[1]:]
+				self._replace_text(self.slice[0], self.slice[1], "")
 				self.slice = [self.slice[0], self.slice[0]]
 				#handle char length list
 			elif self.slice[0] > 0:
-				self.label.text = self.text[:self.slice[0] - 1] + self.text[self.slice[1]:]
+				self._replace_text(self.slice[0] - 1, self.slice[1], "")
 				self.slice = [self.slice[0] - 1, self.slice[1] - 1]
 		elif key == DELKEY:
 			if slice_len != 0:
-				self.label.text = self.text[:self.slice[0]] + self.text[self.slice[1]:]
-				self.char_widths = self.char_widths[:self.slice[0]] + self.char_widths[self.slice[1]:]
+				self._replace_text(self.slice[0], self.slice[1], "")
 				self.slice = [self.slice[0], self.slice[0]]
-			elif self.slice[1] < len(self.text):
-				self.label.text = self.text[:self.slice[0]] + self.text[self.slice[1] + 1:]
+			elif self.slice[1] < len(self._chars):
+				self._replace_text(self.slice[0], self.slice[1] + 1, "")
 
 		elif key == LEFTARROWKEY:
 			slice_len = abs(self.slice[0] - self.slice[1])
@@ -383,7 +468,7 @@ class TextInput(Widget):
 		elif key == RIGHTARROWKEY:
 			slice_len = abs(self.slice[0] - self.slice[1])
 			if (self.slice_direction in [1, 0]):
-				if is_shifted  and self.slice[1] < len(self.text):
+				if is_shifted  and self.slice[1] < len(self._chars):
 					self.slice = [self.slice[0], self.slice[1] + 1]
 					self.slice_direction = 1
 				elif is_shifted:
@@ -391,7 +476,7 @@ class TextInput(Widget):
 				else:
 					if slice_len > 0:
 						self.slice = [self.slice[1], self.slice[1]]
-					elif self.slice[1] < len(self.text):
+					elif self.slice[1] < len(self._chars):
 						self.slice = [self.slice[1] + 1, self.slice[1] + 1]
 					self.slice_direction = 0
 			elif self.slice_direction == -1:
@@ -432,8 +517,9 @@ class TextInput(Widget):
 			elif key == SPACEKEY: char = " "
 			#elif key == TABKEY: char = "\t"
 			elif key in (ENTERKEY, PADENTER):
-				if self.on_enter_key:
-					self.on_enter_key(self)
+				if not self.on_enter_key:
+					return False
+				self.on_enter_key(self)
 			elif not is_shifted:
 				if key == ACCENTGRAVEKEY: char = "`"
 				elif key == MINUSKEY: char = "-"
@@ -459,13 +545,16 @@ class TextInput(Widget):
 				elif key == PERIODKEY: char = ">"
 				elif key == SLASHKEY: char = "?"
 
+			if char is None and key not in (ENTERKEY, PADENTER):
+				# Let the key bubble up to the parent widgets
+				return False
+
 			if char:
 				#need option to limit text to length of box
 				#need to replace all selected text with new char
 				#need copy place somewhere
 
-				self.label.text = self.text[:self.slice[0]] + char + self.text[self.slice[1]:]
-				self.char_widths = self.char_widths[:self.slice[0]] + [self.system.textlib.dimensions(self.label.fontid, char * 20)[0] / 20] + self.char_widths[self.slice[1]:]
+				self._replace_text(self.slice[0], self.slice[1], char)
 				self.slice = [self.slice[0] + 1, self.slice[0] + 1]
 				self.slice_direction = 0
 
@@ -475,8 +564,18 @@ class TextInput(Widget):
 		#ensure cursor is not hidden
 		self.time = time.time()
 
+		return True
+
 	def _draw(self):
-		temp = self.text
+		# Update the caret and the visible text before drawing them
+		if self.selection_refresh == 1 or self._room != self._visible_width():
+			self.update_selection()
+			self.selection_refresh = 0
+
+		# Catch the label up with any edits or scrolling
+		if self._label_dirty:
+			self.label.text = ''.join(self._chars[self._first:self._last])
+			self._label_dirty = False
 
 		if self == self.system.focused_widget and self._active == 0:
 			self.activate()
@@ -484,19 +583,12 @@ class TextInput(Widget):
 		# Now draw the children
 		Widget._draw(self)
 
-		self.label.text = temp
-
 		if self.colormode == 1 and self.system.focused_widget != self:
 			self._active = 0
 			self.swapcolors(0)
 			self.virgin = 1
 			self.colormode = 0
 
-		#selection code needs to be called after draw, which is tracked internally to TextInput
-		if self.selection_refresh == 1:
-			self.update_selection()
-			self.selection_refresh = 0
-
 		#handle blinking cursor
 		if self.slice[0] - self.slice[1] == 0 and self._active:
 			if time.time() - self.time > 1.0:
@@ -1,30 +1,64 @@
 # This module encapsulates texture loading so we are not dependent on bge.texture
 
-from .gl_utils import *
+from .render import GL_RGBA, GL_BGRA
 try:
 	from bge import texture
 	import aud
 	USING_BGE_TEXTURE = True
+	USING_QT = False
 except ImportError:
-	from PyQt4 import QtOpenGL, QtGui
 	USING_BGE_TEXTURE = False
+	try:
+		from PyQt4 import QtGui
+		USING_QT = True
+	except ImportError:
+		# Without either, no images can be loaded (which is fine for headless use)
+		USING_QT = False
+
+def load_image_data(path):
+	"""Loads an image's pixels, for uploading with
+	:py:meth:`bgui.render.RenderBackend.upload_texture` or
+	:py:meth:`bgui.render.RenderBackend.update_texture`
+
+	:param path: the path to the image
+	:rtype: a (width, height, format, data) tuple, or None if the image could not be loaded
+	"""
+
+	if USING_BGE_TEXTURE:
+		img = texture.ImageFFmpeg(path)
+		img.scale = False
+		data = img.image
+		if data == None:
+			return None
+
+		return img.size[0], img.size[1], GL_RGBA, data
+	elif USING_QT:
+		img = QtGui.QImage(path)
+		if img.isNull():
+			return None
+
+		# OpenGL wants the rows from the bottom up, and ARGB32 pixels are stored as BGRA
+		img = img.convertToFormat(QtGui.QImage.Format_ARGB32).mirrored()
+		bits = img.constBits()
+		bits.setsize(img.byteCount())
+
+		return img.width(), img.height(), GL_BGRA, bytes(bits)
+	else:
+		return None
+
 
 class Texture:
-	def __init__(self, path, interp_mode):
-		self._tex_id = glGenTextures(1)
+	def __init__(self, backend, path, interp_mode):
+		self._backend = backend
+		self._tex_id = backend.create_texture(interp_mode)
 		self.size = [0, 0]
-		self._interp_mode = None
+		self._interp_mode = interp_mode
 		self.path = None
 
-		# Setup some parameters
-		self.bind()
-		glTexEnvf(GL_TEXTURE_ENV, GL_TEXTURE_ENV_MODE, GL_MODULATE)
-		self.interp_mode = interp_mode
-
 		self.reload(path)
 
 	def __del__(self):
-		glDeleteTextures([self._tex_id])
+		self._backend.delete_texture(self._tex_id)
 
 	@property
 	def interp_mode(self):
@@ -33,22 +67,30 @@ class Texture:
 	@interp_mode.setter
 	def interp_mode(self, value):
 		if value != self._interp_mode:
-			self.bind()
-			glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, value)
-			glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, value)
+			self._backend.set_texture_filter(self._tex_id, value)
 			self._interp_mode = value
 
 	def bind(self):
-		glBindTexture(GL_TEXTURE_2D, self._tex_id)
+		self._backend.bind_texture(self._tex_id)
+
+	def get_quad(self, texco):
+		"""Returns the texture to bind and the texture coordinates to use to
+		draw the texture with the given coordinates
+
+		:param texco: the texture coordinates (relative to this texture)
+		:rtype: a (texture id, texture coordinates) tuple
+		"""
+
+		return self._tex_id, texco
 
 
 class ImageTexture(Texture):
 
 	_cache = {}
 
-	def __init__(self, image, interp_mode, caching):
+	def __init__(self, backend, image, interp_mode, caching):
 		self._caching = caching
-		super().__init__(image, interp_mode);
+		super().__init__(backend, image, interp_mode);
 
 	def reload(self, image):
 		if image == self.path:
@@ -59,50 +101,32 @@ class ImageTexture(Texture):
 			img = ImageTexture._cache[image]
 		else:
 			# Load the image data from disk
-			if USING_BGE_TEXTURE:
-				img = texture.ImageFFmpeg(image)
-				img.scale = False
-				if self._caching:
-					ImageTexture._cache[image] = img
-			else:
-				img = QtGui.QImage(image)
-
-		if USING_BGE_TEXTURE:
-			data = img.image
-			if data == None:
-				print("Unabled to load the image", image)
-				return
+			img = load_image_data(image)
+			if img is not None and self._caching:
+				ImageTexture._cache[image] = img
 
-			# Upload the texture data
-			self.bind()
-			glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, img.size[0], img.size[1], 0,
-							GL_RGBA, GL_UNSIGNED_BYTE, data)
+		if img is None:
+			print("Unable to load the image", image)
+			return
 
-			self.image_size = img.size[:]
-		else:
-			if img.isNull():
-				print("Unable to load the image", image)
-				return
-			glDeleteTextures([self._tex_id])
-			self._tex_id = QtOpenGL.QGLContext.currentContext().bindTexture(img)
-			self.interp_mode = self.interp_mode
-			self.image_size = [img.width(), img.height()]
+		# Upload the texture data
+		width, height, format, data = img
+		self._backend.upload_texture(self._tex_id, width, height, format, data)
 
+		self.image_size = [width, height]
 
 		# Save the image name
 		self.path = image
 
-		img = None
-
 
 class VideoTexture(Texture):
-	def __init__(self, video, interp_mode, repeat, play_audio):
+	def __init__(self, backend, video, interp_mode, repeat, play_audio):
 		self.repeat = repeat
 		self.play_audio = play_audio
 		self.video = None
 		self.audio = None
 
-		super().__init__(video, interp_mode)
+		super().__init__(backend, video, interp_mode)
 
 	def __del__(self):
 		super().__del__()
@@ -132,9 +156,7 @@ class VideoTexture(Texture):
 			print("Unable to load the video", video)
 			return
 
-		self.bind()
-		glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, vid.size[0], vid.size[1],
-				0, GL_RGBA, GL_UNSIGNED_BYTE, data)
+		self._backend.upload_texture(self._tex_id, vid.size[0], vid.size[1], GL_RGBA, data)
 
 		self.image_size = vid.size[:]
 		self.path = video
@@ -146,9 +168,7 @@ class VideoTexture(Texture):
 		self.video.refresh()
 		data = self.video.image
 		if data:
-			self.bind()
-			glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, self.video.size[0], self.video.size[1],
-					0, GL_RGBA, GL_UNSIGNED_BYTE, data)
+			self._backend.upload_texture(self._tex_id, self.video.size[0], self.video.size[1], GL_RGBA, data)
 
 	def play(self, start, end, use_frames=True, fps=None):
 		if not self.video:
@@ -60,6 +60,9 @@ class Theme(configparser.ConfigParser):
 		self._legacy_warnings = []
 		self._support_warnings = []
 
+		# Theme values for each widget type and section, shared between widgets
+		self._widget_themes = {}
+
 	def supports(self, widget):
 		"""Checks to see if the theme supports a given widget.
 
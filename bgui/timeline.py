@@ -0,0 +1,174 @@
+"""
+Timelines combine animations into sequences and parallel groups, with
+optional delays and looping. A timeline is run by adding it to any widget
+with :py:meth:`bgui.widget.Widget.add_animation`.
+
+Here is a simple example that slides a panel in, waits and slides it back
+out, three times over::
+
+	slide = bgui.Sequence(
+		bgui.ArrayAnimation(panel, 'position', [0.7, 0.05], 500, None, easing='out_cubic'),
+		bgui.Delay(1000),
+		bgui.ArrayAnimation(panel, 'position', [0.7, -0.3], 500, None, easing='in_cubic'),
+		loops=3)
+	panel.add_animation(slide)
+
+Each step of a timeline is started at the exact time the previous step
+finished rather than on the next frame, so long or looping timelines do not
+drift. Use loops=-1 to repeat forever.
+"""
+
+import time
+
+
+class Delay:
+	"""A pause for use in a :py:class:`Sequence`"""
+
+	widget = None
+
+	def __init__(self, time_):
+		"""
+		:param time_: the length of the delay in milliseconds
+		"""
+
+		self.time = time_
+		self.start(time.time())
+
+	@property
+	def end_time(self):
+		"""The timestamp at which the delay finishes"""
+		return self.start_time + self.time / 1000
+
+	def start(self, now):
+		self.start_time = now
+
+	def update(self, now=None):
+		if now is None:
+			now = time.time()
+
+		return now < self.end_time
+
+
+class Sequence:
+	"""Runs animations one after the other"""
+
+	widget = None
+
+	def __init__(self, *steps, loops=1, callback=None):
+		"""
+		:param steps: the animations, delays or timelines to run
+		:param loops: the number of times to run the sequence (-1 = infinite)
+		:param callback: an optional callback that is called when the sequence is complete
+		"""
+
+		self.steps = steps
+		self.loops = loops
+		self.callback = callback
+
+		self.start(time.time())
+
+	def start(self, now):
+		self.start_time = self.end_time = self._loop_start = now
+		self._loop = 0
+		self._index = 0
+
+		if self.steps:
+			self.steps[0].start(now)
+
+	def update(self, now=None):
+		"""Advance the sequence, catching up on any steps that finished since the last update
+
+		:param now: the current frame's timestamp (defaults to time.time())
+		:rtype: False if the sequence has finished, True otherwise
+		"""
+
+		if now is None:
+			now = time.time()
+
+		end = now
+		while self.steps:
+			step = self.steps[self._index]
+			if step.update(now):
+				return True
+
+			# Start the next step where this one finished
+			end = step.end_time
+			self._index += 1
+
+			if self._index == len(self.steps):
+				self._loop += 1
+
+				# Stop if we're done, or if the sequence takes no time and would never finish
+				if self._loop == self.loops or end <= self._loop_start:
+					break
+
+				self._index = 0
+				self._loop_start = end
+
+			self.steps[self._index].start(end)
+
+		self.end_time = end
+
+		if self.callback:
+			self.callback()
+		return False
+
+
+class Parallel:
+	"""Runs animations at the same time"""
+
+	widget = None
+
+	def __init__(self, *items, loops=1, callback=None):
+		"""
+		:param items: the animations, delays or timelines to run
+		:param loops: the number of times to run the group (-1 = infinite)
+		:param callback: an optional callback that is called when every item is complete
+		"""
+
+		self.items = items
+		self.loops = loops
+		self.callback = callback
+
+		self.start(time.time())
+
+	def start(self, now):
+		self.start_time = self.end_time = now
+		self._loop = 0
+		self._restart(now)
+
+	def _restart(self, now):
+		self._loop_start = now
+		for item in self.items:
+			item.start(now)
+		self._running = list(self.items)
+
+	def update(self, now=None):
+		"""Advance every item in the group
+
+		:param now: the current frame's timestamp (defaults to time.time())
+		:rtype: False if the group has finished, True otherwise
+		"""
+
+		if now is None:
+			now = time.time()
+
+		while True:
+			self._running = [i for i in self._running if i.update(now)]
+			if self._running:
+				return True
+
+			end = max([i.end_time for i in self.items], default=now)
+			self._loop += 1
+
+			# Stop if we're done, or if the group takes no time and would never finish
+			if self._loop == self.loops or end <= self._loop_start:
+				break
+
+			self._restart(end)
+
+		self.end_time = end
+
+		if self.callback:
+			self.callback()
+		return False
@@ -0,0 +1,306 @@
+"""
+The tween engine interpolates numeric widget properties (such as position,
+size or percent) from their current value to a target value over time. The
+state of every running tween is kept in a few flat arrays so that all of them
+can be advanced with a single vectorized step per frame. NumPy is used when
+it is available, otherwise the engine falls back to a plain Python loop.
+
+Tweens are normally started through :py:meth:`bgui.widget.Widget.tween` or
+:py:meth:`bgui.widget.Widget.move`.
+"""
+
+from .easing import get_easing, EASING_RESOLUTION
+import time
+
+try:
+	import numpy
+	USING_NUMPY = True
+except ImportError:
+	USING_NUMPY = False
+
+
+# The most easing curves to keep in the lookup table before dropping unused ones
+_MAX_EASING_ROWS = 64
+
+
+class Tween:
+	"""A single running tween. These are created by :py:meth:`TweenEngine.add`."""
+
+	__slots__ = ('target', 'attrib', 'is_array', 'start', 'delta', 'start_time',
+				'duration', 'callback', 'easing', 'cancelled', 'last')
+
+	def __init__(self, target, attrib, value, start_time, duration, callback, easing):
+		current = getattr(target, attrib)
+
+		self.target = target
+		self.attrib = attrib
+		self.is_array = not isinstance(current, (int, float))
+
+		if self.is_array:
+			self.start = [float(i) for i in current]
+			self.delta = [float(v) - s for s, v in zip(self.start, value)]
+		else:
+			self.start = [float(current)]
+			self.delta = [float(value) - self.start[0]]
+
+		self.start_time = start_time
+		self.duration = max(duration, 1e-9)
+		self.callback = callback
+		self.easing = easing
+		self.cancelled = False
+		self.last = None
+
+	def cancel(self):
+		"""Stop the tween where it is without running its callback"""
+		self.cancelled = True
+
+	def _apply(self, values):
+		if self.is_array:
+			setattr(self.target, self.attrib, values)
+		else:
+			setattr(self.target, self.attrib, values[0])
+
+
+class TweenEngine:
+	"""Runs every tween for a system"""
+
+	def __init__(self):
+		self._tweens = []
+		self._pending = []
+		self._active = {}
+		self._cancelled = False
+
+		if USING_NUMPY:
+			# Easing curves are stored as rows of a single lookup table
+			self._easing_rows = {}
+			self._easing_table = numpy.empty((0, EASING_RESOLUTION + 1))
+
+			# Per tween
+			self._easing = numpy.empty(0, dtype=numpy.intp)
+			self._start_time = numpy.empty(0)
+			self._duration = numpy.empty(0)
+			self._sizes = numpy.empty(0, dtype=numpy.intp)
+			self._offsets = numpy.empty(0, dtype=numpy.intp)
+
+			# Per channel (one for each component of a tweened value)
+			self._start = numpy.empty(0)
+			self._delta = numpy.empty(0)
+			self._last = numpy.empty(0)
+
+	def __len__(self):
+		return len(self._tweens) + len(self._pending)
+
+	def add(self, target, attrib, value, time_, callback=None, start_time=None, easing='linear'):
+		"""Start tweening target.attrib to value. Any tween already running on
+		the same attribute is cancelled.
+
+		:param target: the object to animate (usually a widget)
+		:param attrib: the name of the attribute to animate
+		:param value: the final value (a number or a sequence of numbers)
+		:param time_: the time in milliseconds to take
+		:param callback: an optional callback that is called when the tween is complete
+		:param start_time: the time the tween starts (defaults to time.time())
+		:param easing: the name of an easing curve (see :py:mod:`bgui.easing`)
+		:rtype: :py:class:`Tween`
+		"""
+
+		if start_time is None:
+			start_time = time.time()
+
+		tween = Tween(target, attrib, value, start_time, time_ / 1000, callback, get_easing(easing))
+
+		key = (id(target), attrib)
+		old = self._active.get(key)
+		if old is not None:
+			old.cancel()
+			self._cancelled = True
+		self._active[key] = tween
+
+		self._pending.append(tween)
+		return tween
+
+	def cancel(self, tween):
+		"""Stop a tween without running its callback
+
+		:param tween: the tween to stop
+		"""
+
+		tween.cancel()
+		self._cancelled = True
+
+	def tweens_of(self, target):
+		"""Returns the running tweens of an object
+
+		:param target: the object the tweens animate
+		:rtype: list of :py:class:`Tween`
+		"""
+
+		return [i for i in self._tweens + self._pending if i.target is target and not i.cancelled]
+
+	def remove_targets(self, targets):
+		"""Stop and forget every tween of the given objects without running
+		their callbacks, so the tweens no longer keep the objects alive
+
+		:param targets: the objects to stop animating
+		"""
+
+		ids = {id(i) for i in targets}
+
+		self._pending = [i for i in self._pending if id(i.target) not in ids]
+
+		keep = [id(i.target) not in ids for i in self._tweens]
+		if not all(keep):
+			self._remove(keep)
+
+		for key in [i for i in self._active if i[0] in ids]:
+			del self._active[key]
+
+	def update(self, now):
+		"""Advance every tween to the time now, writing back the values that
+		changed and running the callbacks of any tweens that finished.
+
+		:param now: the current frame's timestamp
+		"""
+
+		if self._pending:
+			self._merge_pending()
+
+		if self._cancelled:
+			self._remove([not i.cancelled for i in self._tweens])
+			self._cancelled = False
+
+		if not self._tweens:
+			return
+
+		if USING_NUMPY:
+			done = self._update_numpy(now)
+		else:
+			done = self._update_python(now)
+
+		if done:
+			finished = [self._tweens[i] for i in done]
+
+			keep = [True] * len(self._tweens)
+			for i in done:
+				keep[i] = False
+			self._remove(keep)
+
+			for tween in finished:
+				key = (id(tween.target), tween.attrib)
+				if self._active.get(key) is tween:
+					del self._active[key]
+
+			for tween in finished:
+				if tween.callback:
+					tween.callback()
+
+	def _update_numpy(self, now):
+		tweens = self._tweens
+
+		progress = (now - self._start_time) / self._duration
+		numpy.clip(progress, 0.0, 1.0, out=progress)
+
+		# Look up the eased progress, interpolating between table samples
+		x = progress * EASING_RESOLUTION
+		index = numpy.minimum(x.astype(numpy.intp), EASING_RESOLUTION - 1)
+		low = self._easing_table[self._easing, index]
+		high = self._easing_table[self._easing, index + 1]
+		eased = low + (high - low) * (x - index)
+
+		values = self._start + self._delta * eased.repeat(self._sizes)
+
+		# Only write back the tweens that produced a new value
+		changed = numpy.flatnonzero(numpy.logical_or.reduceat(values != self._last, self._offsets))
+		self._last = values
+
+		if len(changed):
+			channels = values.tolist()
+			offsets = self._offsets[changed].tolist()
+			for i, start in zip(changed.tolist(), offsets):
+				tween = tweens[i]
+				if tween.is_array:
+					setattr(tween.target, tween.attrib, channels[start:start + len(tween.start)])
+				else:
+					setattr(tween.target, tween.attrib, channels[start])
+
+		return numpy.flatnonzero(progress >= 1.0).tolist()
+
+	def _update_python(self, now):
+		done = []
+
+		for i, tween in enumerate(self._tweens):
+			progress = (now - tween.start_time) / tween.duration
+			progress = 0.0 if progress < 0.0 else 1.0 if progress > 1.0 else progress
+
+			eased = tween.easing(progress)
+			values = [s + d * eased for s, d in zip(tween.start, tween.delta)]
+			if values != tween.last:
+				tween.last = values
+				tween._apply(values)
+
+			if progress >= 1.0:
+				done.append(i)
+
+		return done
+
+	def _merge_pending(self):
+		pending = self._pending
+		self._pending = []
+
+		# Drop the rows of curves that are no longer used (such as ones made
+		# from a new function for each tween) before adding more
+		if USING_NUMPY and len(self._easing_rows) > _MAX_EASING_ROWS:
+			self._easing_rows = {}
+			self._easing_table = numpy.empty((0, EASING_RESOLUTION + 1))
+			self._easing = numpy.array([self._easing_row(i.easing) for i in self._tweens], dtype=numpy.intp)
+
+		self._tweens.extend(pending)
+
+		if not USING_NUMPY:
+			return
+
+		sizes = [len(i.start) for i in pending]
+		channels = []
+		for i in pending:
+			channels.extend(i.start)
+
+		self._easing = numpy.concatenate((self._easing, [self._easing_row(i.easing) for i in pending]))
+		self._start_time = numpy.concatenate((self._start_time, [i.start_time for i in pending]))
+		self._duration = numpy.concatenate((self._duration, [i.duration for i in pending]))
+		self._sizes = numpy.concatenate((self._sizes, numpy.array(sizes, dtype=numpy.intp)))
+		self._start = numpy.concatenate((self._start, channels))
+		self._delta = numpy.concatenate((self._delta, [d for i in pending for d in i.delta]))
+
+		# NaN never compares equal, so new tweens are always written on their first step
+		self._last = numpy.concatenate((self._last, numpy.full(len(channels), numpy.nan)))
+		self._update_offsets()
+
+	def _remove(self, keep):
+		"""Drop the tweens whose entry in keep is False"""
+
+		self._tweens = [i for i, k in zip(self._tweens, keep) if k]
+
+		if not USING_NUMPY:
+			return
+
+		keep = numpy.array(keep, dtype=bool)
+		channel_keep = keep.repeat(self._sizes)
+
+		self._easing = self._easing[keep]
+		self._start_time = self._start_time[keep]
+		self._duration = self._duration[keep]
+		self._sizes = self._sizes[keep]
+		self._start = self._start[channel_keep]
+		self._delta = self._delta[channel_keep]
+		self._last = self._last[channel_keep]
+		self._update_offsets()
+
+	def _easing_row(self, easing):
+		row = self._easing_rows.get(easing)
+		if row is None:
+			row = self._easing_rows[easing] = len(self._easing_table)
+			self._easing_table = numpy.vstack((self._easing_table, easing.values))
+		return row
+
+	def _update_offsets(self):
+		self._offsets = numpy.cumsum(self._sizes) - self._sizes
@@ -1,4 +1,4 @@
-from .gl_utils import *
+from .render import GL_LINEAR
 from .texture import VideoTexture
 
 from .widget import Widget, BGUI_DEFAULT, WeakMethod
@@ -8,6 +8,8 @@ from .image import Image
 class Video(Image):
 	"""Widget for displaying video"""
 
+	__slots__ = ('_on_finish', '_on_finish_called')
+
 	def __init__(self, parent, vid, name=None, play_audio=False, repeat=0, aspect=None, size=[1, 1], pos=[0, 0],
 				sub_theme='', options=BGUI_DEFAULT):
 		"""
@@ -26,7 +28,7 @@ class Video(Image):
 
 		Image.__init__(self, parent, name, None, aspect, size, pos, sub_theme=sub_theme, options=options)
 
-		self._texture = VideoTexture(vid, GL_LINEAR, repeat, play_audio)
+		self._texture = VideoTexture(self.system.backend, vid, GL_LINEAR, repeat, play_audio)
 
 		self._on_finish = None
 		self._on_finish_called = False
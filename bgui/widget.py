@@ -10,6 +10,8 @@ This module defines the following constants:
 	* BGUI_NO_THEME = 8
 	* BGUI_NO_FOCUS = 16
 	* BGUI_CACHE = 32
+	* BGUI_CLIP = 64
+	* BGUI_RENDER_CACHE = 128
 
 	* BGUI_CENTERED = BGUI_CENTERX | BGUI_CENTERY
 
@@ -32,6 +34,12 @@ This module defines the following constants:
 """
 
 from collections import OrderedDict
+from contextlib import contextmanager
+from operator import attrgetter
+from types import MappingProxyType
+from .easing import get_easing
+from .render_cache import RenderCache
+import warnings
 import weakref
 import time
 
@@ -43,6 +51,8 @@ BGUI_NO_NORMALIZE = 4
 BGUI_NO_THEME = 8
 BGUI_NO_FOCUS = 16
 BGUI_CACHE = 32
+BGUI_CLIP = 64
+BGUI_RENDER_CACHE = 128
 
 BGUI_CENTERED = BGUI_CENTERX | BGUI_CENTERY
 
@@ -59,6 +69,13 @@ BGUI_MOUSE_RELEASE = 2
 BGUI_MOUSE_ACTIVE = 4
 
 
+# Sort key for drawing siblings
+_draw_key = attrgetter('_z_index', '_order')
+
+# Shared by all widgets that don't have any children
+_NO_CHILDREN = MappingProxyType(OrderedDict())
+
+
 class WeakMethod:
 	def __init__(self, f):
 		if hasattr(f, "__func__"):
@@ -70,64 +87,92 @@ class WeakMethod:
 
 	def __call__(self, *args):
 		if self.c == None:
-			self.f(*args)
+			return self.f(*args)
 		elif self.c() == None:
 			return None
 		else:
-			self.f(*((self.c(),) + args))
+			return self.f(*((self.c(),) + args))
 
 
 class Animation:
-	def __init__(self, widget, attrib, value, time_, callback):
+	def __init__(self, widget, attrib, value, time_, callback, easing='linear'):
+		"""
+		:param widget: the widget to animate
+		:param attrib: the name of the attribute to animate
+		:param value: the final value of the attribute
+		:param time_: the time in milliseconds to take
+		:param callback: an optional callback that is called when the animation is complete
+		:param easing: the name of an easing curve (see :py:mod:`bgui.easing`)
+		"""
 		self.widget = widget
 		self.attrib = attrib
-		self.prev_value = getattr(widget, attrib)
 		self.next_value = value
-		self.start_time = self.last_update = time.time()
 		self.time = time_
 		self.callback = callback
+		self.easing = get_easing(easing)
 
-	def update(self):
-		if (time.time() - self.start_time) * 1000 >= self.time:
-			# We're done, run the callback and
-			# return false to let widget know we can be removed
-			if self.callback:
-				self.callback()
-			return False
+		self.start(time.time())
 
-		dt = (time.time() - self.last_update) * 1000
-		self.last_update = time.time()
+	@property
+	def end_time(self):
+		"""The timestamp at which the animation finishes"""
+		return self.start_time + self.time / 1000
 
-		dv = ((self.next_value - self.prev_value) / self.time) * dt
+	def start(self, now):
+		"""(Re)start the animation from the attribute's current value
 
-		setattr(self.widget, self.attrib, getattr(self.widget, self.attrib) + dv)
+		:param now: the timestamp to start at
+		"""
 
-		return True
+		self.prev_value = getattr(self.widget, self.attrib)
+		self.start_time = now
 
+	def _progress(self, now):
+		return self.easing((now - self.start_time) * 1000 / self.time) if self.time > 0 else 1.0
 
-class ArrayAnimation(Animation):
-	def __init__(self, widget, attrib, value, time_, callback):
-		super().__init__(widget, attrib, value, time_, callback)
-		self.prev_value = getattr(widget, attrib)[:]
+	def update(self, now=None):
+		"""Advance the animation. The attribute is set from the time elapsed
+		since the animation started, so it does not drift with the frame rate.
+
+		:param now: the current frame's timestamp (defaults to time.time())
+		:rtype: False if the animation has finished, True otherwise
+		"""
+
+		if now is None:
+			now = time.time()
 
-	def update(self):
-		if (time.time() - self.start_time) * 1000 >= self.time:
+		progress = self._progress(now)
+		setattr(self.widget, self.attrib, self.prev_value + (self.next_value - self.prev_value) * progress)
+
+		if now >= self.end_time:
 			# We're done, run the callback and
 			# return false to let widget know we can be removed
 			if self.callback:
 				self.callback()
 			return False
 
-		dt = (time.time() - self.last_update) * 1000
-		self.last_update = time.time()
+		return True
 
-		new_value = getattr(self.widget, self.attrib)[:]
 
-		for i in range(len(self.prev_value)):
-			dv = ((self.next_value[i] - self.prev_value[i]) / self.time) * dt
+class ArrayAnimation(Animation):
+	def start(self, now):
+		self.prev_value = getattr(self.widget, self.attrib)[:]
+		self.start_time = now
 
-			new_value[i] += dv
-		setattr(self.widget, self.attrib, new_value)
+	def update(self, now=None):
+		if now is None:
+			now = time.time()
+
+		progress = self._progress(now)
+		setattr(self.widget, self.attrib,
+				[p + (n - p) * progress for p, n in zip(self.prev_value, self.next_value)])
+
+		if now >= self.end_time:
+			# We're done, run the callback and
+			# return false to let widget know we can be removed
+			if self.callback:
+				self.callback()
+			return False
 
 		return True
 
@@ -135,9 +180,22 @@ class ArrayAnimation(Animation):
 class Widget:
 	"""The base widget class"""
 
+	# Slots keep large widget trees small. Attributes that aren't listed here
+	# (including those of subclasses without slots) go in the instance dict.
+	__slots__ = ('name', 'options', 'theme', 'frozen', '_visible', '_system', '_parent',
+				'_hover', '_callbacks', '_children', '_draw_order', '_z_index', '_order',
+				'_depth', '_aspect', '_x', '_y', '_width', '_height', '_rect', '_bounds',
+				'_layout_dirty', '_render_cache',
+				'__dict__', '__weakref__')
+
 	theme_section = 'Widget'
 	theme_options = {}
 
+	# Whether _draw() only draws through the system's quad batch (or flushes the
+	# batch itself). Otherwise the batch is flushed before the widget is drawn,
+	# so subclasses that draw with OpenGL directly should leave this as False.
+	_batched = False
+
 	def __init__(self, parent, name=None, aspect=None, size=[0, 0], pos=[0, 0], sub_theme='',
 			options=BGUI_DEFAULT):
 		"""
@@ -172,49 +230,42 @@ class Widget:
 		#: Whether or not the widget should accept events
 		self.frozen = False
 
-		#: Whether or not the widget is visible
-		self.visible = True
+		self._visible = True
+
+		# Event callbacks, created when the first one is set
+		self._callbacks = None
 
-		# Event callbacks
-		self._on_click = None
-		self._on_release = None
-		self._on_hover = None
-		self._on_active = None
-		self._on_mouse_enter = None
-		self._on_mouse_exit = None
+		# Siblings with the same z-index are drawn in the order they were created
+		self._z_index = 0
+		self._order = next(self._system()._widget_counter)
 
 		# Setup the parent
 		parent._attach_widget(self)
 		self._parent = weakref.proxy(parent)
 
-		# A dictionary to store children widgets
-		self._children = OrderedDict()
+		# A dictionary to store children widgets, and the children sorted into
+		# drawing order. These are created when the first child is attached.
+		self._children = _NO_CHILDREN
+		self._draw_order = ()
 
-		#: The widget's z-index. Widget's with a higher z-index are drawn
-		#: over those that have a lower z-index
-		self.z_index = 0
-
-		# Setup the widget's size and position
+		# Setup the widget's size and position. The absolute (pixel) values
+		# are worked out later by the layout pass (see _update_layout()).
+		self._depth = 0 if parent is self else parent._depth + 1
+		self._aspect = aspect
 		self._width = size[0]
 		self._height = size[1]
-		if options & BGUI_NO_NORMALIZE:
-			if aspect:
-				self._base_width = size[1] * aspect
-			else:
-				self._base_width = size[0]
-			self._base_height = size[1]
-		else:
-			if aspect:
-				self._base_width = size[1] * aspect * self.parent._base_height
-			else:
-				self._base_width = size[0] * self.parent._base_width
-			self._base_height = size[1] * self.parent._base_height
+		self._x = pos[0]
+		self._y = pos[1]
+
+		# The area covered by the widget and its children, used to skip drawing
+		# widgets that are off screen (see _get_bounds())
+		self._bounds = None
 
-		self.x = pos[0]
-		self.y = pos[1]
+		# Created on the first draw for widgets with the BGUI_RENDER_CACHE option
+		self._render_cache = None
 
-		# A list of running animations
-		self.anims = []
+		self._layout_dirty = False
+		self._invalidate_layout()
 
 	def __del__(self):
 		# Debug print
@@ -235,73 +286,88 @@ class Widget:
 			elif not hasattr(self, "theme"):
 				self.theme = None
 		else:
-			theme = self.system.theme
-			theme = theme[self.theme_section] if theme.has_section(self.theme_section) else None
+			system_theme = self.system.theme
+			theme = system_theme[self.theme_section] if system_theme.has_section(self.theme_section) else None
 
 			if theme and not (self.options & BGUI_NO_THEME):
-				self.theme = {}
-
-				for k, v in self.theme_options.items():
-					if k in theme:
-						self.theme[k] = theme[k]
-					else:
-						self.theme[k] = v
+				# Widgets of the same type and section share their theme values,
+				# so they are read-only to keep changes from leaking between widgets
+				key = (self.__class__, self.theme_section)
+				self.theme = system_theme._widget_themes.get(key)
+
+				if self.theme is None:
+					values = {}
+					for k, v in self.theme_options.items():
+						if k in theme:
+							values[k] = theme[k]
+						else:
+							values[k] = v
+
+					self.theme = system_theme._widget_themes[key] = MappingProxyType(values)
 			elif not hasattr(self, "theme"):
 				self.theme = self.theme_options
 
 	@property
 	def on_click(self):
 		"""The widget's on_click callback"""
-		return self._on_click
+		return self._get_callback('on_click')
 
 	@on_click.setter
 	def on_click(self, value):
-		self._on_click = WeakMethod(value)
+		self._set_callback('on_click', value)
 
 	@property
 	def on_release(self):
 		"""The widget's on_release callback"""
-		return self._on_release
+		return self._get_callback('on_release')
 
 	@on_release.setter
 	def on_release(self, value):
-		self._on_release = WeakMethod(value)
+		self._set_callback('on_release', value)
 
 	@property
 	def on_hover(self):
 		"""The widget's on_hover callback"""
-		return self._on_hover
+		return self._get_callback('on_hover')
 
 	@on_hover.setter
 	def on_hover(self, value):
-		self._on_hover = WeakMethod(value)
+		self._set_callback('on_hover', value)
 
 	@property
 	def on_mouse_enter(self):
 		"""The widget's on_mouse_enter callback"""
-		return self._on_mouse_enter
+		return self._get_callback('on_mouse_enter')
 
 	@on_mouse_enter.setter
 	def on_mouse_enter(self, value):
-		self._on_mouse_enter = WeakMethod(value)
+		self._set_callback('on_mouse_enter', value)
 
 	@property
 	def on_mouse_exit(self):
 		"""The widget's on_mouse_exit callback"""
-		return self._on_mouse_exit
+		return self._get_callback('on_mouse_exit')
 
 	@on_mouse_exit.setter
 	def on_mouse_exit(self, value):
-		self._on_mouse_exit = WeakMethod(value)
+		self._set_callback('on_mouse_exit', value)
 
 	@property
 	def on_active(self):
 		"""The widget's on_active callback"""
-		return self._on_active
+		return self._get_callback('on_active')
 
 	@on_active.setter
 	def on_active(self, value):
-		self._on_active = WeakMethod(value)
+		self._set_callback('on_active', value)
+
+	def _get_callback(self, name):
+		return self._callbacks.get(name) if self._callbacks else None
+
+	def _set_callback(self, name, value):
+		if self._callbacks is None:
+			self._callbacks = {}
+		self._callbacks[name] = WeakMethod(value)
 
 	@property
 	def parent(self):
@@ -311,7 +377,7 @@ class Widget:
 	@parent.setter
 	def parent(self, value):
 		self._parent = value
-		self._update_position(self._base_size, self._base_value)
+		self._invalidate_layout()
 
 	@property
 	def system(self):
@@ -323,6 +389,39 @@ class Widget:
 		"""The widget's children"""
 		return self._children
 
+	@property
+	def z_index(self):
+		"""The widget's z-index. Widgets with a higher z-index are drawn
+		over (and receive mouse events before) those that have a lower z-index"""
+		return self._z_index
+
+	@z_index.setter
+	def z_index(self, value):
+		if value == self._z_index:
+			return
+
+		self._z_index = value
+
+		# Only the widget's siblings need to be re-sorted (the system has no siblings)
+		if self._depth:
+			self._parent._draw_order.sort(key=_draw_key)
+			self._parent.invalidate()
+
+	@property
+	def visible(self):
+		"""Whether or not the widget is visible"""
+		return self._visible
+
+	@visible.setter
+	def visible(self, value):
+		if value == self._visible:
+			return
+
+		self._visible = value
+
+		# The widget appears in (or disappears from) any cached drawing of its parent
+		self._parent.invalidate()
+
 	@property
 	def x(self):
 		"""The widget's x position"""
@@ -331,23 +430,7 @@ class Widget:
 	@x.setter
 	def x(self, x):
 		self._x = x
-		# Make non-normalized
-		if not (self.options & BGUI_NO_NORMALIZE):
-			x *= self.parent._base_width
-
-		# Make centered
-		if self.options & BGUI_CENTERX:
-			x = self.parent._base_width / 2 - self._base_width / 2
-
-		# Make absolute
-		if self.parent != self:
-			x += self.parent._base_x
-
-		self._base_x = x
-
-		# Update any children
-		for widget in self.children.values():
-			widget.x = widget._x
+		self._invalidate_layout()
 
 	@property
 	def y(self):
@@ -357,23 +440,7 @@ class Widget:
 	@y.setter
 	def y(self, y):
 		self._y = y
-		# Make non-normalized
-		if not (self.options & BGUI_NO_NORMALIZE):
-			y *= self.parent._base_height
-
-		# Make centered
-		if self.options & BGUI_CENTERY:
-			y = self.parent._base_height / 2 - self._base_height / 2
-
-		# Make absolute
-		if self.parent != self:
-			y += self.parent._base_y
-
-		self._base_y = y
-
-		# Update any children
-		for widget in self.children.values():
-			widget.y = widget._y
+		self._invalidate_layout()
 
 	@property
 	def position(self):
@@ -393,39 +460,20 @@ class Widget:
 	@width.setter
 	def width(self, width):
 		self._width = width
-		# Make non-normalized
-		if not (self.options & BGUI_NO_NORMALIZE):
-			width *= self.parent._base_width
-
-		self._base_width = width
 
-		# Re-center the x position
-		if self.options & BGUI_CENTERX:
-			self.x = self._x
-
-		for widget in self.children.values():
-			widget.width = widget._width
+		# An explicit width overrides the aspect ratio given to the constructor
+		self._aspect = None
+		self._invalidate_layout()
 
 	@property
 	def height(self):
 		"""The widget's height"""
 		return self._height
-		
+
 	@height.setter
 	def height(self, height):
 		self._height = height
-		# Make non-normalized
-		if not (self.options & BGUI_NO_NORMALIZE):
-			height *= self.parent._base_height
-
-		self._base_height = height
-
-		# Re-center the y position
-		if self.options & BGUI_CENTERY:
-			self.y = self._y
-
-		for widget in self.children.values():
-			widget.height = widget._height
+		self._invalidate_layout()
 
 	@property
 	def size(self):
@@ -437,41 +485,176 @@ class Widget:
 		self.width = value[0]
 		self.height = value[1]
 
+	# The absolute geometry is only valid after the layout pass, so reading it
+	# resolves any pending changes first.
+	@property
+	def _base_x(self):
+		self._resolve_layout()
+		return self._rect[0]
+
+	@property
+	def _base_y(self):
+		self._resolve_layout()
+		return self._rect[1]
+
+	@property
+	def _base_width(self):
+		self._resolve_layout()
+		rect = self._rect
+		return rect[2] - rect[0]
+
+	@property
+	def _base_height(self):
+		self._resolve_layout()
+		rect = self._rect
+		return rect[3] - rect[1]
+
+	def _invalidate_layout(self):
+		"""Queue the widget (and by extension its children) for the next layout pass"""
+		if not self._layout_dirty:
+			self._layout_dirty = True
+			self._system()._layout_queue.append(self)
+
+	def _resolve_layout(self):
+		system = self._system()
+		if system._layout_queue:
+			system.update_layout()
+
+	def _update_layout(self):
+		"""Recompute the absolute geometry of the widget and its children"""
+
+		options = self.options
+
+		# The system is its own parent, and isn't normalized or centered
+		if self._depth:
+			px0, py0, px1, py1 = self._parent._rect
+			parent_width = px1 - px0
+			parent_height = py1 - py0
+
+		if options & BGUI_NO_NORMALIZE:
+			height = self._height
+			width = height * self._aspect if self._aspect else self._width
+			x = self._x
+			y = self._y
+		else:
+			height = self._height * parent_height
+			width = height * self._aspect if self._aspect else self._width * parent_width
+			x = self._x * parent_width
+			y = self._y * parent_height
+
+		# Make centered
+		if options & BGUI_CENTERX:
+			x = parent_width / 2 - width / 2
+
+		if options & BGUI_CENTERY:
+			y = parent_height / 2 - height / 2
+
+		# Make absolute
+		if self._depth:
+			x += px0
+			y += py0
+
+		self._rect = (x, y, x + width, y + height)
+		self._layout_dirty = False
+		self._invalidate_bounds()
+
+		# Cached drawings above this widget are invalidated once for the whole
+		# subtree by System.update_layout(), so only our own is marked here
+		if self._render_cache is not None:
+			self._render_cache.dirty = True
+
+		# Keep the system's hit-testing index up to date
+		self._system()._spatial_index.update(self, self._rect)
+
+		# Update any children
+		for widget in self._children.values():
+			widget._update_layout()
+
+	@contextmanager
+	def batch_layout(self):
+		"""A context manager that groups size and position changes into a single
+		layout pass, which is run when the block exits instead of waiting for the
+		next call to :py:meth:`bgui.system.System.render`. Reading a widget's
+		absolute geometry inside the block still resolves any pending changes.
+
+		Example::
+
+			with panel.batch_layout():
+				panel.position = [0.1, 0.2]
+				panel.size = [0.5, 0.5]
+		"""
+
+		system = self.system
+		system._layout_batches += 1
+		try:
+			yield self
+		finally:
+			system._layout_batches -= 1
+			if not system._layout_batches:
+				system.update_layout()
+
+	@property
+	def _gl_rect(self):
+		"""The widget's absolute bounds as an (x0, y0, x1, y1) tuple. This is
+		cached by the layout pass, so reading it does not allocate."""
+		self._resolve_layout()
+		return self._rect
+
 	@property
 	def _gl_position(self):
-	    return [
-					[self._base_x, self._base_y],
-					[self._base_x + self._base_width, self._base_y],
-					[self._base_x + self._base_width, self._base_y + self._base_height],
-					[self._base_x, self._base_y + self._base_height]
-				]
-	
-
-	def move(self, position, time, callback=None):
+		"""The widget's four corners, counter-clockwise from the bottom left"""
+		x0, y0, x1, y1 = self._gl_rect
+		return [[x0, y0], [x1, y0], [x1, y1], [x0, y1]]
+
+	@property
+	def running_animations(self):
+		"""A tuple of the animations added to the widget with add_animation(),
+		and the tweens started with tween() or move(), that are still running"""
+		system = self.system
+		return tuple([i[1] for i in system._animations if i[0] is self] + system._tweens.tweens_of(self))
+
+	@property
+	def anims(self):
+		"""Deprecated, use :py:attr:`running_animations` instead"""
+		warnings.warn("Widget.anims is deprecated, use Widget.running_animations instead",
+				DeprecationWarning, stacklevel=2)
+		return self.running_animations
+
+	def tween(self, attrib, value, time, callback=None, easing='linear'):
+		"""Animate a numeric property (such as position, size or percent) to a
+		new value. Any tween already running on the same property is replaced.
+
+		:param attrib: The name of the property to animate
+		:param value: The new value (a number or a list of numbers)
+		:param time: The time in milliseconds to take
+		:param callback: An optional callback that is called when the animation is complete
+		:param easing: The name of an easing curve (see :py:mod:`bgui.easing`)
+		:rtype: :py:class:`bgui.tween.Tween`
+		"""
+
+		return self.system._tweens.add(self, attrib, value, time, callback, easing=easing)
+
+	def move(self, position, time, callback=None, easing='linear'):
 		"""Move a widget to a new position over a number of frames
 
 		:param positon: The new position
 		:param time: The time in milliseconds to take doing the move
 		:param callback: An optional callback that is called when he animation is complete
+		:param easing: The name of an easing curve (see :py:mod:`bgui.easing`)
 		"""
 
-		self.anims.append(ArrayAnimation(self, "position", position, time, callback))
+		self.tween("position", position, time, callback, easing)
 
 	def add_animation(self, animation):
 		"""Add the animation to the list of currently running animations
 
 		:param animation: The animation
 		"""
-		self.anims.append(animation)
-
-	def _update_anims(self):
-		self.anims[:] = [i for i in self.anims if i.update()]
-
-		for widget in self.children.values():
-			widget._update_anims()
+		self.system._animations.append((self, animation))
 
 	def _handle_mouse(self, pos, event):
-		"""Run any event callbacks"""
+		"""Run any event callbacks. The system works out which widgets are under
+		the mouse, so this does not pass the event on to the widget's children."""
 		# Don't run if we're not visible or frozen
 		if not self.visible or self.frozen:
 			return
@@ -493,24 +676,12 @@ class Widget:
 			if self.on_active:
 				self.on_active(self)
 
-		# Update focus
-		if event == BGUI_MOUSE_CLICK and not self.system.lock_focus and not self.options & BGUI_NO_FOCUS:
-			self.system.focused_widget = self
-
 		if not self._hover:
 			self._handle_mouse_enter()
 			if self.on_mouse_enter:
 				self.on_mouse_enter(self)
 		self._hover = True
 
-		# Run any children callback methods
-		for widget in self.children.values():
-			if (widget._gl_position[0][0] <= pos[0] <= widget._gl_position[1][0]) and \
-				(widget._gl_position[0][1] <= pos[1] <= widget._gl_position[2][1]):
-					widget._handle_mouse(pos, event)
-			else:
-				widget._update_hover(False)
-
 	def _update_hover(self, hover=False):
 		if not hover and self._hover:
 			self._handle_mouse_exit()
@@ -518,14 +689,10 @@ class Widget:
 				self.on_mouse_exit(self)
 		self._hover = hover
 
-		for widget in self.children.values():
-			widget._update_hover(hover)
-
 	def _handle_key(self, key, is_shifted):
-		"""Handle any keyboard input"""
-		for widget in self.children.values():
-			if self._hover:
-				widget._handle_key(key, is_shifted)
+		"""Handle any keyboard input. Keys are only sent to the focused widget,
+		and are passed on to its parent if this does not return True."""
+		return False
 
 	# These exist so they can be overridden by subclasses
 	def _handle_click(self):
@@ -552,21 +719,167 @@ class Widget:
 		if not isinstance(widget, Widget):
 			raise TypeError("Expected a Widget object")
 
-		if widget in self.children.values():
+		if self._children.get(widget.name) is widget:
 			raise ValueError("%s is already attached to this widget" % (widget.name))
 
-		self.children[widget.name] = widget
+		if self._children is _NO_CHILDREN:
+			self._children = OrderedDict()
+			self._draw_order = []
+
+		self._children[widget.name] = widget
+		self.system._spatial_index.add(widget)
+
+		# New widgets usually go on top, otherwise re-sort the (mostly sorted) list
+		draw_order = self._draw_order
+		draw_order.append(widget)
+		if len(draw_order) > 1 and _draw_key(draw_order[-2]) > _draw_key(widget):
+			draw_order.sort(key=_draw_key)
 
 	def _remove_widget(self, widget):
 		"""Removes the widget from this widget's children"""
 
-		del self.children[widget.name]
+		del self._children[widget.name]
+		self._draw_order.remove(widget)
+		self._invalidate_bounds()
+		self.invalidate()
+
+		system = self.system
+		system._spatial_index.remove_tree(widget)
+
+		# Removed widgets aren't animated any more
+		if system._animations or system._tweens:
+			subtree = []
+			stack = [widget]
+			while stack:
+				child = stack.pop()
+				subtree.append(child)
+				stack.extend(child._children.values())
+			system._stop_animations(subtree)
+
+	def _get_draw_rect(self):
+		"""Returns the area the widget draws in as an (x0, y0, x1, y1) tuple.
+		Subclasses that draw outside of their bounds should override this."""
+		return self._rect
+
+	def _get_bounds(self):
+		"""Returns the area covered by the widget and its children. This is
+		cached until the layout of the widget or one of its children changes."""
+
+		bounds = self._bounds
+		if bounds is None:
+			x0, y0, x1, y1 = self._get_draw_rect()
+
+			# Children of clipping widgets can't draw outside of it
+			if not self.options & BGUI_CLIP:
+				for child in self._draw_order:
+					cx0, cy0, cx1, cy1 = child._get_bounds()
+					if cx0 < x0: x0 = cx0
+					if cy0 < y0: y0 = cy0
+					if cx1 > x1: x1 = cx1
+					if cy1 > y1: y1 = cy1
+
+			bounds = self._bounds = (x0, y0, x1, y1)
+
+		return bounds
+
+	def _invalidate_bounds(self):
+		"""Throw away the cached bounds of the widget and its parents"""
+
+		widget = self
+		while widget._bounds is not None:
+			widget._bounds = None
+			if not widget._depth:
+				break
+			widget = widget._parent
+
+	def invalidate(self):
+		"""Marks the widget as changed, so any cached drawing of it (see
+		:py:mod:`bgui.render_cache`) is redrawn on the next frame. This is
+		done automatically for size and position changes.
+
+		:rtype: None
+		"""
+
+		widget = self
+		while True:
+			if widget._render_cache is not None:
+				widget._render_cache.dirty = True
+
+			if not widget._depth:
+				break
+			widget = widget._parent
+
+	def _draw_cached(self):
+		"""Draws the widget and its children from the widget's render cache"""
+
+		system = self._system()
+		if not system.backend.supports_render_targets:
+			self._draw()
+			return
+
+		if self._render_cache is None:
+			self._render_cache = RenderCache(system.backend)
+			system._cached_widgets.add(self)
+
+		self._render_cache.draw(self, system)
 
 	def _draw(self):
 		"""Draws the widget and the widget's children"""
 
 		# This base class has nothing to draw, so just draw the children
 
-		for child in self.children:
-			if self.children[child].visible:
-				self.children[child]._draw()
+		if not self._draw_order:
+			return
+
+		system = self._system()
+		clip = system._clip_rect
+
+		if self.options & BGUI_CLIP:
+			x0, y0, x1, y1 = self._rect
+			system._set_clip((max(x0, clip[0]), max(y0, clip[1]), min(x1, clip[2]), min(y1, clip[3])))
+
+		# Skip any children that are outside of the clip rect (or viewport),
+		# or are too small to see
+		left, bottom, right, top = system._clip_rect
+		threshold = system.cull_threshold
+		batch = system._batch
+		culled = drawn = 0
+
+		for child in self._draw_order:
+			if not child._visible:
+				continue
+
+			bounds = child._bounds
+			if bounds is None:
+				bounds = child._get_bounds()
+			x0, y0, x1, y1 = bounds
+
+			if x1 < left or x0 > right or y1 < bottom or y0 > top or \
+					(x1 - x0 < threshold and y1 - y0 < threshold):
+				culled += 1
+				continue
+
+			# Make sure widgets that draw for themselves are drawn over any batched quads
+			draws_itself = not child._batched and child.__class__._draw is not Widget._draw
+			if draws_itself:
+				batch.flush()
+
+				# As before batching, they start with no texture bound
+				system.backend.bind_texture(0)
+
+			drawn += 1
+			if child.options & BGUI_RENDER_CACHE:
+				child._draw_cached()
+			else:
+				child._draw()
+
+			# They may also have changed the state without telling the backend
+			if draws_itself:
+				system.backend.invalidate()
+
+		system.culled_widgets += culled
+		system._drawn_widgets += drawn
+		system._visited_widgets += len(self._draw_order)
+
+		if self.options & BGUI_CLIP:
+			system._set_clip(clip)
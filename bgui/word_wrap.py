@@ -0,0 +1,112 @@
+"""
+Word wrapping for :py:class:`bgui.text_block.TextBlock`. Each different word
+is measured once per font and size, and lines are broken by adding up the
+widths of their words, so wrapping (or rewrapping at a new width) doesn't
+measure whole lines. Paragraphs (separated by newlines) before the first one
+that changed since the last wrap keep their lines, so adding to the end of
+the text only wraps the new paragraphs.
+"""
+
+# The most words to remember the widths of for each font and size
+_MAX_WORDS = 10000
+
+
+class WordWrapper:
+	"""Breaks text into lines that fit a width"""
+
+	def __init__(self, textlib):
+		"""
+		:param textlib: the text library to measure words with
+		"""
+
+		self._textlib = textlib
+
+		# (fontid, pt_size) -> {word: width}
+		self._word_widths = {}
+
+		# The (paragraph, lines) of the last wrap, and what it was wrapped with
+		self._paragraphs = []
+		self._wrapped_with = None
+
+		#: The number of paragraphs wrapped by the last call to wrap() (the rest were reused)
+		self.wrapped_paragraphs = 0
+
+	def _measure(self, fontid, pt_size, words):
+		key = (fontid, pt_size)
+		widths = self._word_widths.get(key)
+		if widths is None or len(widths) > _MAX_WORDS:
+			widths = self._word_widths[key] = {}
+
+		missing = [word for word in set(words) if word not in widths]
+		if missing:
+			textlib = self._textlib
+			textlib.size(fontid, pt_size, 72)
+			for word, dimensions in zip(missing, textlib.measure_many(fontid, missing)):
+				widths[word] = dimensions[0]
+
+		return widths
+
+	def line_height(self, fontid, pt_size):
+		"""Returns the height of a line of text in pixels (the width of 'Mj',
+		which is what :py:class:`bgui.label.Label` uses for its height)
+
+		:param fontid: the font the text is drawn with
+		:param pt_size: the size the text is drawn at
+		"""
+
+		return self._measure(fontid, pt_size, ['Mj'])['Mj']
+
+	def wrap(self, text, width, fontid, pt_size):
+		"""Returns the lines of text wrapped to fit width. Runs of whitespace
+		between words are replaced with single spaces, and words that are too
+		wide for a line get a line to themselves.
+
+		:param text: the text to wrap
+		:param width: the width of a line in pixels
+		:param fontid: the font the text is drawn with (as returned by the text library's load())
+		:param pt_size: the size the text is drawn at
+		:rtype: list of strings
+		"""
+
+		paragraphs = text.split('\n')
+		settings = (width, fontid, pt_size)
+
+		# Keep the lines of the unchanged paragraphs at the start
+		old = self._paragraphs if settings == self._wrapped_with else []
+		keep = 0
+		for (paragraph, lines), new in zip(old, paragraphs):
+			if paragraph != new:
+				break
+			keep += 1
+
+		wrapped = old[:keep]
+		changed = [paragraph.split() for paragraph in paragraphs[keep:]]
+		widths = self._measure(fontid, pt_size, [word for words in changed for word in words] + [' '])
+		space = widths[' ']
+
+		for paragraph, words in zip(paragraphs[keep:], changed):
+			lines = []
+			line = []
+			line_width = 0
+
+			for word in words:
+				word_width = widths[word]
+				if line and line_width + space + word_width > width:
+					lines.append(' '.join(line))
+					line = []
+
+				if line:
+					line_width += space + word_width
+				else:
+					line_width = word_width
+				line.append(word)
+
+			# Add what's left (empty paragraphs still get a line)
+			lines.append(' '.join(line))
+			wrapped.append((paragraph, lines))
+
+		self._paragraphs = wrapped
+		self._wrapped_with = settings
+		self.wrapped_paragraphs = len(changed)
+
+		return [line for paragraph, lines in wrapped for line in lines]